@@ -1,7 +1,7 @@
 """
 Usage:
     import PDF_Finder
-    from PDF_Finder import Config, run
+    from PDF_Finder import Config, run, harvest
 """
 
 from __future__ import annotations
@@ -10,9 +10,16 @@ __version__ = "1.0.0"
 
 from .config import Config
 from .http import backoff_request, fetch_crossref, fetch_unpaywall, best_pdf_url, download_pdf
-from .pdfops import search_pdf, move_pdf_atomic
+from .http import download_pdf_status
+from .pdfops import search_pdf, scan_pdf, move_pdf_atomic, PageSplitter
+from .ocr import OcrLane
 from .orchestrator import run, process_batch_pdfs, prepare_one
-from .cache import sanitize_filename
+from .orchestrator import prefetch, prefetch_one, harvest
+from .scheduler import HostScheduler
+from .snapshot import SnapshotIndex, build_indexes
+from .layout import Manifest, migrate_to_sharded
+from .service import HarvestService, serve
+from .cache import sanitize_filename, NegativeCache
 from .logging import setup_logging
 
 __all__ = [
@@ -22,11 +29,26 @@ __all__ = [
     "fetch_unpaywall",
     "best_pdf_url",
     "download_pdf",
+    "download_pdf_status",
     "search_pdf",
+    "scan_pdf",
+    "PageSplitter",
+    "OcrLane",
     "move_pdf_atomic",
     "run",
+    "harvest",
+    "prefetch",
+    "prefetch_one",
     "process_batch_pdfs",
     "prepare_one",
+    "HostScheduler",
+    "SnapshotIndex",
+    "build_indexes",
+    "Manifest",
+    "migrate_to_sharded",
+    "HarvestService",
+    "serve",
     "sanitize_filename",
+    "NegativeCache",
     "setup_logging",
 ]
\ No newline at end of file
@@ -1,11 +1,15 @@
 # cache.py
+import hashlib
 import json
 import logging
 import re
+import time
 import pathlib
 import yaml
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+from .config import Config
 
 # ruff formatting
 def sanitize_filename(s: str) -> str:
@@ -13,14 +17,55 @@ def sanitize_filename(s: str) -> str:
     return re.sub(r"[^A-Za-z0-9._-]+", "_", s)
 
 
-def ensure_dirs(base: pathlib.Path, cfg: Dict[str, Any]):
+def normalize_doi(doi: str) -> str:
+    d = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "doi:"):
+        if d.startswith(prefix):
+            d = d[len(prefix) :]
+    return d
+
+
+# ---------------- sharded layout: hashed, collision-free names ----------------
+
+
+def doi_key(doi: str) -> str:
+    return hashlib.sha1(normalize_doi(doi).encode("utf-8")).hexdigest()
+
+
+def entry_name(doi: str) -> str:
+    """
+    File stem for `doi` in the sharded layout: readable prefix + 64-bit DOI hash.
+    Deterministic, and distinct for DOIs that sanitize_filename maps together.
+    """
+    return f"{sanitize_filename(normalize_doi(doi))[:80]}-{doi_key(doi)[:16]}"
+
+
+def shard(doi: str) -> str:
+    """Two-level prefix directory ("ab/cd") spreading entries over 65,536 folders."""
+    k = doi_key(doi)
+    return f"{k[:2]}/{k[2:4]}"
+
+
+def is_sharded(cfg: Config) -> bool:
+    return bool(cfg.folders.sharded)
+
+
+def pdf_path(folder: pathlib.Path, doi: str, sharded: bool = False) -> pathlib.Path:
+    if sharded:
+        return folder / shard(doi) / f"{entry_name(doi)}.pdf"
+    return folder / f"{sanitize_filename(doi)}.pdf"
+
+
+def ensure_dirs(base: pathlib.Path, cfg: Config):
     (base / "cache" / "crossref").mkdir(parents=True, exist_ok=True)
     (base / "cache" / "unpaywall").mkdir(parents=True, exist_ok=True)
     (base / "cache" / "matches").mkdir(parents=True, exist_ok=True)
+    (base / "cache" / "negative").mkdir(parents=True, exist_ok=True)
+    (base / "cache" / "ocr").mkdir(parents=True, exist_ok=True)
     # staging + final folders
-    (base / cfg["folders"]["downloads"]).mkdir(parents=True, exist_ok=True)
-    (base / cfg["folders"]["found"]).mkdir(parents=True, exist_ok=True)
-    (base / cfg["folders"]["notfound"]).mkdir(parents=True, exist_ok=True)
+    (base / cfg.folders.downloads).mkdir(parents=True, exist_ok=True)
+    (base / cfg.folders.found).mkdir(parents=True, exist_ok=True)
+    (base / cfg.folders.notfound).mkdir(parents=True, exist_ok=True)
 
 
 def load_yaml(path: str) -> Dict[str, Any]:
@@ -28,7 +73,11 @@ def load_yaml(path: str) -> Dict[str, Any]:
         return yaml.safe_load(f) or {}
 
 
-def cache_path(base: pathlib.Path, ns: str, doi: str) -> pathlib.Path:
+def cache_path(
+    base: pathlib.Path, ns: str, doi: str, sharded: bool = False
+) -> pathlib.Path:
+    if sharded:
+        return base / "cache" / ns / shard(doi) / f"{entry_name(doi)}.json"
     return base / "cache" / ns / f"{sanitize_filename(doi)}.json"
 
 
@@ -42,9 +91,171 @@ def read_cache_json(path: pathlib.Path) -> Optional[Dict[str, Any]]:
 
 
 def write_cache_json(path: pathlib.Path, data: Dict[str, Any]):
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
     try:
-        path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        try:
+            path.write_text(text, encoding="utf-8")
+        except FileNotFoundError:
+            # first entry of a shard directory
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding="utf-8")
     except Exception as e:
         logging.getLogger("harvest").warning(f"Cache write failed {path}: {e}")
+
+
+# ---------------- projected metadata: the fields the harvest reads ----------------
+
+SCHEMA = "_schema"
+SCHEMA_VERSION = 1
+
+
+def _location(loc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not loc:
+        return None
+    return {k: loc.get(k) for k in ("url_for_pdf", "url", "license")}
+
+
+def project_crossref(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Crossref `message` → the fields flatten_meta and the layout tools use."""
+    issued = meta.get("issued") or {}
+    return {
+        SCHEMA: SCHEMA_VERSION,
+        "DOI": meta.get("DOI", ""),
+        "title": meta.get("title") or [],
+        "container-title": meta.get("container-title") or [],
+        "issued": {"date-parts": issued.get("date-parts") or [[None]]},
+        "author": [
+            {"given": a.get("given", ""), "family": a.get("family", "")}
+            for a in (meta.get("author") or [])
+        ],
+        "publisher": meta.get("publisher", ""),
+        "type": meta.get("type", ""),
+        "URL": meta.get("URL", ""),
+    }
+
+
+def project_unpaywall(ua: Dict[str, Any]) -> Dict[str, Any]:
+    """Unpaywall record → OA status plus the locations best_pdf_url looks at."""
+    return {
+        SCHEMA: SCHEMA_VERSION,
+        "doi": ua.get("doi", ""),
+        "is_oa": ua.get("is_oa"),
+        "best_oa_location": _location(ua.get("best_oa_location")),
+        "oa_locations": [
+            _location(loc)
+            for loc in (ua.get("oa_locations") or [])
+            if loc and (loc.get("url_for_pdf") or loc.get("url"))
+        ],
+    }
+
+
+PROJECTIONS = {"crossref": project_crossref, "unpaywall": project_unpaywall}
+
+
+def is_projected(data: Dict[str, Any]) -> bool:
+    return data.get(SCHEMA) == SCHEMA_VERSION
+
+
+def project(ns: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Projected record for source `ns` (raw payloads and older schemas are converted)."""
+    if not data or is_projected(data) or ns not in PROJECTIONS:
+        return data
+    return PROJECTIONS[ns](data)
+
+
+# ---------------- negative cache: remembered failures + retry schedule ----------------
+
+NOT_FOUND = "not_found"  # 404/410 or other permanent 4xx
+NO_OA = "no_oa"  # Unpaywall answered, but without any OA location
+NOT_PDF = "not_pdf"  # paywall/HTML landing page instead of a PDF
+TRANSIENT = "transient"  # timeouts, 5xx, 429 after the backoff ladder
+
+HOUR = 3600.0
+
+# retry-after (hours) per failure class; the n-th consecutive failure uses the
+# n-th entry, the last entry repeats
+DEFAULT_RETRY_HOURS: Dict[str, List[float]] = {
+    NOT_FOUND: [720, 2160],
+    NO_OA: [168, 720],
+    NOT_PDF: [168, 720],
+    TRANSIENT: [1, 6, 24],
+}
+
+
+class NegativeCache:
+    """
+    Per-DOI record of failed lookups/downloads, one JSON file per DOI:
+        {"<stage>": {"kind", "attempts", "last", "retry_at"}, ...}
+    Stages are "crossref", "unpaywall" and "pdf".
+    """
+
+    def __init__(
+        self,
+        base: pathlib.Path,
+        schedule: Optional[Dict[str, List[float]]] = None,
+        sharded: bool = False,
+    ):
+        self.base = base
+        self.sharded = sharded
+        (base / "cache" / "negative").mkdir(parents=True, exist_ok=True)
+        self.schedule = dict(DEFAULT_RETRY_HOURS)
+        self.schedule.update(schedule or {})
+
+    def _path(self, doi: str) -> pathlib.Path:
+        return cache_path(self.base, "negative", doi, self.sharded)
+
+    def get(self, doi: str, stage: str) -> Optional[Dict[str, Any]]:
+        return (read_cache_json(self._path(doi)) or {}).get(stage)
+
+    def blocked(self, doi: str, stage: str, now: Optional[float] = None) -> Optional[str]:
+        """Failure class if `stage` failed before and is not due for a retry yet."""
+        e = self.get(doi, stage)
+        if e and (now or time.time()) < e.get("retry_at", 0):
+            return e.get("kind")
+        return None
+
+    def due(self, doi: str, stage: str, now: Optional[float] = None) -> bool:
+        """True if `stage` failed before and its retry time has passed."""
+        e = self.get(doi, stage)
+        return bool(e) and (now or time.time()) >= e.get("retry_at", 0)
+
+    def record(
+        self, doi: str, stage: str, kind: str, now: Optional[float] = None
+    ) -> Dict[str, Any]:
+        now = now or time.time()
+        data = read_cache_json(self._path(doi)) or {}
+        prev = data.get(stage) or {}
+        attempts = prev.get("attempts", 0) + 1 if prev.get("kind") == kind else 1
+        hours = self.schedule.get(kind) or self.schedule[TRANSIENT]
+        wait = float(hours[min(attempts, len(hours)) - 1]) * HOUR
+        data[stage] = {
+            "kind": kind,
+            "attempts": attempts,
+            "last": now,
+            "retry_at": now + wait,
+        }
+        write_cache_json(self._path(doi), data)
+        return data[stage]
+
+    def clear(self, doi: str, stage: str):
+        path = self._path(doi)
+        data = read_cache_json(path)
+        if not data or stage not in data:
+            return
+        del data[stage]
+        if data:
+            write_cache_json(path, data)
+        else:
+            path.unlink(missing_ok=True)
+
+
+def negative_cache_from_cfg(base: pathlib.Path, cfg: Config) -> Optional[NegativeCache]:
+    """NegativeCache for this run, or None when caching or the negative cache is off."""
+    neg_cfg = cfg.negative_cache
+    if not cfg.cache.enabled or not neg_cfg.enabled:
+        return None
+    return NegativeCache(
+        base,
+        {k: getattr(neg_cfg, k) for k in DEFAULT_RETRY_HOURS},
+        sharded=is_sharded(cfg),
+    )
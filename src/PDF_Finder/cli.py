@@ -1,7 +1,13 @@
 # cli.py
 import argparse
 import asyncio
-from .orchestrator import run
+import pathlib
+from .orchestrator import run, prefetch
+from .config import Config
+from .logging import setup_logging
+from .snapshot import build_indexes
+from .layout import migrate_to_sharded
+from .service import serve
 
 # ruff formatting
 def main():
@@ -9,8 +15,44 @@ def main():
         description="Batched DOI harvester: staged downloads → processing → reports"
     )
     parser.add_argument("--config", required=True, help="Path to YAML config file")
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Only fetch Crossref/Unpaywall metadata (warms caches, writes prefetch_report)",
+    )
+    parser.add_argument(
+        "--build-snapshot-index",
+        action="store_true",
+        help="Index the Crossref/Unpaywall dumps listed under `snapshots` and exit",
+    )
+    parser.add_argument(
+        "--migrate-layout",
+        action="store_true",
+        help="Move an existing flat output tree into the sharded layout and exit",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a long-lived job server (see `service` in the config)",
+    )
     args = parser.parse_args()
-    asyncio.run(run(args.config))
+    if args.build_snapshot_index or args.migrate_layout:
+        cfg = Config.from_yaml(args.config)
+        out_dir = pathlib.Path(cfg.output_dir).resolve()
+        setup_logging(cfg, out_dir)
+        if args.build_snapshot_index:
+            build_indexes(out_dir, cfg)
+        if args.migrate_layout:
+            migrate_to_sharded(out_dir, cfg)
+    elif args.serve:
+        try:
+            asyncio.run(serve(Config.from_yaml(args.config)))
+        except KeyboardInterrupt:
+            pass
+    elif args.prefetch:
+        asyncio.run(prefetch(args.config))
+    else:
+        asyncio.run(run(args.config))
 
 
 if __name__ == "__main__":
@@ -1,10 +1,11 @@
 # config.py
 from __future__ import annotations
 
+import logging
 import yaml
-from dataclasses import dataclass, field
+from dataclasses import MISSING, Field, dataclass, field, fields, is_dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, get_args, get_origin, get_type_hints
 
 # ruff formatting
 @dataclass
@@ -12,17 +13,31 @@ class FolderConfig:
     downloads: str = "downloads"
     found: str = "output_found"
     notfound: str = "output_notfound"
+    # hashed two-level shards (ab/cd/<name>-<hash>.pdf) for PDFs and caches
+    sharded: bool = False
 
 
 @dataclass
 class CacheConfig:
     enabled: bool = True
     force_refresh: bool = False
+    # also keep the full Crossref/Unpaywall payloads (cache/<source>_raw/)
+    keep_raw: bool = False
+
+
+@dataclass
+class NegativeCacheConfig:
+    # retry-after schedules in hours, per failure class (n-th failure → n-th entry)
+    enabled: bool = True
+    not_found: list[float] = field(default_factory=lambda: [720.0, 2160.0])
+    no_oa: list[float] = field(default_factory=lambda: [168.0, 720.0])
+    not_pdf: list[float] = field(default_factory=lambda: [168.0, 720.0])
+    transient: list[float] = field(default_factory=lambda: [1.0, 6.0, 24.0])
 
 
 @dataclass
 class HttpConfig:
-    user_agent: str = "pdfharvest/1.0"
+    user_agent: str = ""  # empty: "doi-harvest/2.0 (+<email>)", so the APIs can reach us
     max_keepalive: int = 20
     max_connections: int = 20
 
@@ -31,6 +46,64 @@ class HttpConfig:
 class TimeoutConfig:
     read: float = 30.0
     connect: float = 15.0
+    # per-branch budgets in prepare_one (retries included); 0 = no limit
+    metadata: float = 60.0
+    download: float = 300.0
+
+
+@dataclass
+class SchedulerConfig:
+    enabled: bool = True
+    per_host: int = 2
+    min_per_host: int = 1
+    slow_after: float = 10.0
+
+
+@dataclass
+class SnapshotConfig:
+    # paths/globs of (gzipped) JSONL dumps; empty = live API only
+    crossref: str = ""
+    unpaywall: str = ""
+    index_dir: str = "cache/snapshots"
+    max_age_days: float = 180.0
+    # date of each dump (YYYY-MM-DD); empty = from the file name or the records
+    crossref_date: str = ""
+    unpaywall_date: str = ""
+
+
+@dataclass
+class PrefetchConfig:
+    concurrency: int = 20
+    rate_per_sec: float = 10.0
+    estimate_size: bool = False
+
+
+@dataclass
+class OcrConfig:
+    enabled: bool = False
+    engine: str = "PDF_Finder.ocr:tesseract"  # "module:function", image bytes → text
+    workers: int = 2
+    max_pages: int = 200
+    max_cpu_seconds: float = 600.0
+    cpu_per_page: float = 3.0  # CPU reserved per submitted page until it is measured
+
+
+@dataclass
+class PdfConfig:
+    # PDFs with at least `split_pages` pages are scanned as page slices in a
+    # process pool of `split_workers` (0 / 1 = off)
+    split_pages: int = 300
+    split_workers: int = 4
+
+
+@dataclass
+class ServiceConfig:
+    # --serve: long-running job server with warm clients
+    host: str = "127.0.0.1"
+    port: int = 8765
+    unix_socket: str = ""  # listen on this Unix socket instead of host:port
+    concurrency: int = 10  # DOIs in flight across all jobs
+    keep_jobs: int = 100  # finished jobs kept for status/rows queries
 
 
 @dataclass
@@ -43,7 +116,7 @@ class LoggingConfig:
 
 @dataclass
 class Config:
-    input_excel: str
+    input_excel: str = ""
     doi_column: str = "doi"
     email: str = ""
     batch_size: int = 5
@@ -54,30 +127,75 @@ class Config:
 
     folders: FolderConfig = field(default_factory=FolderConfig)
     cache: CacheConfig = field(default_factory=CacheConfig)
+    negative_cache: NegativeCacheConfig = field(default_factory=NegativeCacheConfig)
     http: HttpConfig = field(default_factory=HttpConfig)
     timeouts: TimeoutConfig = field(default_factory=TimeoutConfig)
+    scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
+    prefetch: PrefetchConfig = field(default_factory=PrefetchConfig)
+    snapshots: SnapshotConfig = field(default_factory=SnapshotConfig)
+    ocr: OcrConfig = field(default_factory=OcrConfig)
+    pdf: PdfConfig = field(default_factory=PdfConfig)
+    service: ServiceConfig = field(default_factory=ServiceConfig)
     logging: LoggingConfig = field(default_factory=LoggingConfig)
 
     @staticmethod
     def from_yaml(path: str | Path) -> "Config":
         with open(path, "r", encoding="utf-8") as f:
             raw = yaml.safe_load(f) or {}
+        return Config.from_dict(raw)
 
-        def subcls(cls, section):
-            return cls(**raw.get(section, {})) if section in raw else cls()
-
-        return Config(
-            input_excel=raw.get("input_excel"),
-            doi_column=raw.get("doi_column", "doi"),
-            email=raw.get("email", ""),
-            batch_size=raw.get("batch_size", 5),
-            concurrency=raw.get("concurrency", 5),
-            write_after_each_batch=raw.get("write_after_each_batch", True),
-            strings=raw.get("strings", []),
-            output_dir=raw.get("output_dir", "output"),
-            folders=subcls(FolderConfig, "folders"),
-            cache=subcls(CacheConfig, "cache"),
-            http=subcls(HttpConfig, "http"),
-            timeouts=subcls(TimeoutConfig, "timeouts"),
-            logging=subcls(LoggingConfig, "logging"),
+    @staticmethod
+    def from_dict(raw: Dict[str, Any]) -> "Config":
+        """
+        Build from a parsed YAML mapping. Unknown keys are ignored with a warning
+        and values are cast to the type of their default (e.g. "20" → 20).
+        """
+        return _build(Config, raw or {}, "")
+
+
+def _default(f: Field) -> Any:
+    if f.default_factory is not MISSING:
+        return f.default_factory()
+    return None if f.default is MISSING else f.default
+
+
+def _coerce(value: Any, hint: Any, default: Any, where: str) -> Any:
+    # cast by the field annotation, so `max_age_days: float = 180` takes 0.5
+    if value is None:
+        return default
+    if get_origin(hint) is list:
+        items = list(value) if isinstance(value, (list, tuple)) else [value]
+        item = (get_args(hint) or (Any,))[0]
+        return [_coerce(v, item, None, where) for v in items]
+    try:
+        if hint is bool:
+            if isinstance(value, str):
+                return value.strip().lower() in ("1", "true", "yes", "on")
+            return bool(value)
+        if hint in (int, float, str):
+            return hint(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid config value for {where}: {value!r} ({e})") from e
+    return value
+
+
+def _build(cls, raw: Dict[str, Any], section: str):
+    if not isinstance(raw, dict):
+        raise ValueError(f"Config section {section or '<root>'} must be a mapping")
+    known = {f.name: f for f in fields(cls)}
+    unknown = sorted(set(raw) - set(known))
+    if unknown:
+        logging.getLogger("harvest").warning(
+            f"Ignoring unknown config keys in {section or '<root>'}: "
+            + ", ".join(map(str, unknown))
         )
+    hints = get_type_hints(cls)
+    kwargs = {}
+    for name, f in known.items():
+        default = _default(f)
+        where = f"{section}.{name}" if section else name
+        if is_dataclass(default):
+            kwargs[name] = _build(type(default), raw.get(name) or {}, where)
+        elif name in raw:
+            kwargs[name] = _coerce(raw[name], hints.get(name, Any), default, where)
+    return cls(**kwargs)
@@ -9,6 +9,8 @@ import pathlib
 
 import httpx
 
+from .cache import NOT_FOUND, NOT_PDF, TRANSIENT
+
 CROSSREF = "https://api.crossref.org/works/"
 UNPAYWALL = "https://api.unpaywall.org/v2/"
 
@@ -31,6 +33,10 @@ async def backoff_request(
                 continue
             r.raise_for_status()
             return r
+        except httpx.HTTPStatusError as e:
+            # 404/410/403...: the answer will not change within this run
+            log.error(f"HTTP error {url}: {e}")
+            raise
         except httpx.HTTPError as e:
             if i == max_tries - 1:
                 log.error(f"HTTP error {url}: {e}")
@@ -75,25 +81,77 @@ def best_pdf_url(ua: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+async def pdf_content_length(client: httpx.AsyncClient, url: str) -> Optional[int]:
+    """HEAD the PDF URL and return its Content-Length, if the host tells us."""
+    try:
+        r = await client.head(url, follow_redirects=True, timeout=20)
+        if r.status_code >= 400:
+            return None
+        n = r.headers.get("Content-Length")
+        return int(n) if n and n.isdigit() else None
+    except Exception:
+        return None
+
+
+def classify_status(status_code: int) -> str:
+    """Negative-cache class for an HTTP error status."""
+    if status_code in (404, 410):
+        return NOT_FOUND
+    if status_code == 429 or status_code >= 500:
+        return TRANSIENT
+    return NOT_PDF  # 401/402/403/451...: paywalled or blocked
+
+
+def classify_error(e: BaseException) -> Optional[str]:
+    """
+    Negative-cache class for an exception raised by a metadata lookup, or None
+    for request errors (400/401/403/422: bad or missing `email`, blocked key)
+    that say nothing about the DOI and must not outlive a config fix.
+    """
+    if isinstance(e, httpx.HTTPStatusError):
+        code = e.response.status_code
+        if code in (404, 410):
+            return NOT_FOUND
+        if code == 429 or code >= 500:
+            return TRANSIENT
+        return None
+    return TRANSIENT
+
+
 async def download_pdf(
     client: httpx.AsyncClient, url: str, out_path: pathlib.Path
 ) -> bool:
+    return await download_pdf_status(client, url, out_path) is None
+
+
+async def download_pdf_status(
+    client: httpx.AsyncClient, url: str, out_path: pathlib.Path
+) -> Optional[str]:
+    """
+    Like download_pdf, but returns None on success and the failure class
+    (NOT_FOUND / NOT_PDF / TRANSIENT) otherwise.
+    """
     log = logging.getLogger("harvest")
+    # write to a side file and rename on success, so a cancelled or failed
+    # download never leaves a truncated PDF at out_path
+    part = out_path.with_name(out_path.name + ".part")
     try:
         async with client.stream("GET", url, timeout=40) as r:
             if r.status_code >= 400:
                 log.warning(f"PDF {url} → {r.status_code}")
-                return False
+                return classify_status(r.status_code)
             out_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(out_path, "wb") as f:
+            with open(part, "wb") as f:
                 async for chunk in r.aiter_bytes():
                     f.write(chunk)
-        with open(out_path, "rb") as f:
+        with open(part, "rb") as f:
             if f.read(4) != b"%PDF":
                 log.warning(f"Not a PDF (magic header) → {url}")
-                out_path.unlink(missing_ok=True)
-                return False
-        return True
+                return NOT_PDF
+        part.replace(out_path)
+        return None
     except Exception as e:
         log.warning(f"PDF download failed {url}: {e}")
-        return False
+        return TRANSIENT
+    finally:
+        part.unlink(missing_ok=True)
@@ -0,0 +1,163 @@
+# layout.py
+from __future__ import annotations
+
+import json
+import logging
+import pathlib
+import re
+from typing import Dict, Optional, Set
+
+import pandas as pd
+
+from .cache import (
+    doi_key,
+    entry_name,
+    pdf_path,
+    cache_path,
+    read_cache_json,
+    sanitize_filename,
+)
+from .config import Config
+
+CACHE_NAMESPACES = (
+    "crossref", "unpaywall", "crossref_raw", "unpaywall_raw", "matches", "negative", "ocr"
+)
+
+
+# ruff formatting
+class Manifest:
+    """
+    Append-only map from sharded file names back to their DOI (manifest.jsonl),
+    one {"key", "name", "doi"} line per DOI; `key` is the hash part of the name.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._dois: Dict[str, str] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self._dois[rec["key"]] = rec["doi"]
+                    except (ValueError, KeyError):
+                        continue
+
+    def __len__(self) -> int:
+        return len(self._dois)
+
+    def add(self, doi: str) -> str:
+        key = doi_key(doi)[:16]
+        if key not in self._dois:
+            self._dois[key] = doi
+            rec = {"key": key, "name": entry_name(doi), "doi": doi}
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        return key
+
+    def doi_for(self, name: str) -> Optional[str]:
+        """DOI of a sharded file/cache name (with or without directory and suffix)."""
+        stem = pathlib.PurePath(name).stem
+        return self._dois.get(stem.rsplit("-", 1)[-1])
+
+
+_OPEN: Dict[pathlib.Path, Manifest] = {}
+
+
+def manifest_for(out_dir: pathlib.Path) -> Manifest:
+    path = out_dir / "manifest.jsonl"
+    if path not in _OPEN:
+        _OPEN[path] = Manifest(path)
+    return _OPEN[path]
+
+
+# ---------------- migration of flat output trees ----------------
+
+
+def _known_dois(out_dir: pathlib.Path, cfg: Config) -> Dict[str, Set[str]]:
+    """sanitize_filename(doi) → DOIs, from the input sheet, reports and metadata caches."""
+    log = logging.getLogger("harvest")
+    dois: Set[str] = set()
+    sources = [
+        (cfg.input_excel, cfg.doi_column),
+        (out_dir / "report.csv", "doi"),
+        (out_dir / "prefetch_report.csv", "doi"),
+    ]
+    for src, col in sources:
+        if not src or not pathlib.Path(src).exists():
+            continue
+        try:
+            df = (
+                pd.read_csv(src)
+                if str(src).endswith(".csv")
+                else pd.read_excel(src)
+            )
+            if col in df.columns:
+                dois.update(str(x).strip() for x in df[col].dropna())
+        except Exception as e:
+            log.warning(f"Cannot read DOIs from {src}: {e}")
+    for ns, field in (("crossref", "DOI"), ("unpaywall", "doi")):
+        for f in (out_dir / "cache" / ns).glob("*.json"):
+            d = (read_cache_json(f) or {}).get(field)
+            if d:
+                dois.add(str(d))
+    known: Dict[str, Set[str]] = {}
+    for d in dois:
+        known.setdefault(sanitize_filename(d), set()).add(d)
+    return known
+
+
+def _resolve(stem: str, known: Dict[str, Set[str]]) -> Optional[str]:
+    # exact flat name, else strip move_pdf_atomic's "_<k>" collision counter
+    cands = known.get(stem) or known.get(re.sub(r"_\d+$", "", stem)) or set()
+    return next(iter(cands)) if len(cands) == 1 else None
+
+
+def migrate_to_sharded(out_dir: pathlib.Path, cfg: Config) -> Dict[str, int]:
+    """
+    Move a flat output tree (downloads/, found/, notfound/, cache/<ns>/) into the
+    sharded layout and record every DOI in the manifest. Files whose DOI cannot be
+    told apart (unknown, or shared by several DOIs) and files whose sharded target
+    already exists are left in place. Returns counters.
+    """
+    log = logging.getLogger("harvest")
+    known = _known_dois(out_dir, cfg)
+    manifest = manifest_for(out_dir)
+    stats = {"moved": 0, "unresolved": 0, "duplicates": 0}
+
+    def move(src: pathlib.Path, doi: Optional[str], tgt_fn):
+        if doi is None:
+            stats["unresolved"] += 1
+            log.warning(f"Cannot map {src} to a single DOI; left in place")
+            return
+        tgt = tgt_fn(doi)
+        if tgt.exists():
+            stats["duplicates"] += 1
+            log.warning(f"{src} → {tgt} already exists; left in place")
+            return
+        tgt.parent.mkdir(parents=True, exist_ok=True)
+        src.replace(tgt)
+        manifest.add(doi)
+        stats["moved"] += 1
+
+    for key in ("downloads", "found", "notfound"):
+        folder = out_dir / getattr(cfg.folders, key)
+        for f in sorted(folder.glob("*.pdf")):
+            move(f, _resolve(f.stem, known), lambda d: pdf_path(folder, d, True))
+
+    for ns in CACHE_NAMESPACES:
+        for f in sorted((out_dir / "cache" / ns).glob("*.json")):
+            data = read_cache_json(f) or {}
+            doi = data.get("DOI") if ns.startswith("crossref") else None
+            doi = doi or (data.get("doi") if ns.startswith("unpaywall") else None)
+            move(
+                f,
+                doi or _resolve(f.stem, known),
+                lambda d: cache_path(out_dir, ns, d, True),
+            )
+
+    log.info(
+        f"Layout migration: {stats['moved']} moved, {stats['unresolved']} unresolved, "
+        f"{stats['duplicates']} duplicates; set folders.sharded: true in the config"
+    )
+    return stats
@@ -3,19 +3,18 @@ import logging
 import logging.handlers
 import pathlib
 from pathlib import Path
-from typing import Any
 from .config import Config
 
 # ruff formatting
-def setup_logging(cfg: dict[str, Any], out_dir: pathlib.Path):
-    log_cfg = cfg.get("logging", {})
-    level = getattr(logging, log_cfg.get("level", "INFO").upper(), logging.INFO)
+def setup_logging(cfg: Config, out_dir: pathlib.Path):
+    log_cfg = cfg.logging
+    level = getattr(logging, str(log_cfg.level).upper(), logging.INFO)
     (out_dir / "logs").mkdir(parents=True, exist_ok=True)
-    log_file = (out_dir / "logs" / log_cfg.get("file", "harvest.log")).resolve()
+    log_file = (out_dir / "logs" / log_cfg.file).resolve()
     handler = logging.handlers.RotatingFileHandler(
         log_file,
-        maxBytes=int(log_cfg.get("rotate_bytes", 10_485_760)),
-        backupCount=int(log_cfg.get("backup_count", 5)),
+        maxBytes=int(log_cfg.rotate_bytes),
+        backupCount=int(log_cfg.backup_count),
         encoding="utf-8",
     )
     fmt = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
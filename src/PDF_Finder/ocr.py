@@ -0,0 +1,171 @@
+# ocr.py
+from __future__ import annotations
+
+import asyncio
+import importlib
+import io
+import logging
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from pypdf import PdfReader
+
+from .config import Config
+from .pdfops import worker_pool
+
+OcrEngine = Callable[[bytes], str]  # page image (PNG/JPEG/... bytes) → text
+
+
+# ruff formatting
+def tesseract(image: bytes) -> str:
+    """Default engine: Tesseract through pytesseract + Pillow (optional dependencies)."""
+    try:
+        import pytesseract
+        from PIL import Image
+    except ImportError as e:
+        raise RuntimeError(
+            "OCR needs `pytesseract` and `Pillow` (and the tesseract binary)"
+        ) from e
+    return pytesseract.image_to_string(Image.open(io.BytesIO(image)))
+
+
+def resolve_engine(engine: Union[str, OcrEngine]) -> OcrEngine:
+    """'package.module:function' → callable (callables pass through)."""
+    if callable(engine):
+        return engine
+    mod, _, name = engine.partition(":")
+    return getattr(importlib.import_module(mod), name)
+
+
+def ocr_pages(
+    pdf_path: str, pages: List[int], engine: Union[str, OcrEngine]
+) -> Dict[str, Any]:
+    """
+    Worker-process entry point: OCR the embedded images of `pages` (1-based).
+    Returns {"texts": {page: text}, "cpu": CPU seconds spent}.
+    """
+    t0 = time.process_time()
+    fn = resolve_engine(engine)
+    texts: Dict[int, str] = {}
+    reader = PdfReader(pdf_path)
+    for pno in pages:
+        parts = []
+        try:
+            for img in reader.pages[pno - 1].images:
+                parts.append(fn(img.data) or "")
+        except Exception as e:
+            logging.getLogger("harvest").warning(f"OCR failed {pdf_path} p{pno}: {e}")
+        texts[pno] = "\n".join(parts)
+    return {"texts": texts, "cpu": time.process_time() - t0}
+
+
+class OcrLane:
+    """
+    Bounded process pool for OCR of text-less pages, with per-run budgets:
+      - `max_pages`: total pages OCR'd in this run
+      - `max_cpu_seconds`: total worker CPU time; once spent, no new jobs start
+    CPU is reserved at submit time (`cpu_per_page` per page, or the measured
+    average once jobs have finished), so a batch of jobs submitted together
+    cannot overshoot the budget. submit() never blocks: it returns None when
+    the budget is exhausted and may OCR only the first pages of a job.
+    A long-running process takes a fresh budget per job with for_job(); the
+    job lanes share this lane's process pool.
+    """
+
+    def __init__(
+        self,
+        engine: Union[str, OcrEngine] = "PDF_Finder.ocr:tesseract",
+        workers: int = 2,
+        max_pages: int = 200,
+        max_cpu_seconds: float = 600.0,
+        cpu_per_page: float = 3.0,
+    ):
+        self.engine = engine
+        self.workers = max(1, int(workers))
+        self.max_pages = int(max_pages)
+        self.max_cpu_seconds = float(max_cpu_seconds)
+        self.pages_used = 0
+        self.cpu_per_page = max(0.0, float(cpu_per_page))
+        self.cpu_used = 0.0
+        self.cpu_reserved = 0.0  # estimated CPU of jobs still running
+        self._pages_done = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._owner: Optional[OcrLane] = None  # lane whose pool a job lane uses
+
+    def for_job(self) -> "OcrLane":
+        """A lane with this lane's limits and fresh budgets, sharing its pool."""
+        lane = OcrLane(
+            self.engine, self.workers, self.max_pages, self.max_cpu_seconds,
+            self.cpu_per_page,
+        )
+        lane._owner = self._owner or self
+        return lane
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._owner is not None:
+            return self._owner._executor()
+        if self._pool is None:
+            self._pool = worker_pool(self.workers)
+        return self._pool
+
+    def exhausted(self) -> bool:
+        return (
+            self.pages_used >= self.max_pages
+            or self.cpu_used + self.cpu_reserved >= self.max_cpu_seconds
+        )
+
+    def _page_cost(self) -> float:
+        if self._pages_done and self.cpu_used:
+            return self.cpu_used / self._pages_done
+        return self.cpu_per_page
+
+    def submit(
+        self, pdf_path: pathlib.Path, pages: List[int]
+    ) -> Optional["asyncio.Future[Dict[str, Any]]"]:
+        if not pages or self.exhausted():
+            return None
+        cost = self._page_cost()
+        n = self.max_pages - self.pages_used
+        if cost > 0:
+            room = self.max_cpu_seconds - self.cpu_used - self.cpu_reserved
+            # a lone job always gets one page, even if a page costs more than the budget
+            n = min(n, max(int(room // cost), 0 if self.cpu_reserved else 1))
+            if n <= 0:
+                return None
+        pages = pages[:n]
+        reserved = cost * len(pages)
+        self.pages_used += len(pages)
+        self.cpu_reserved += reserved
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(
+            self._executor(), ocr_pages, str(pdf_path), pages, self.engine
+        )
+
+        def account(f):
+            self.cpu_reserved = max(0.0, self.cpu_reserved - reserved)
+            if not f.cancelled() and f.exception() is None:
+                self.cpu_used += f.result().get("cpu", 0.0)
+                self._pages_done += len(pages)
+
+        fut.add_done_callback(account)
+        return fut
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+def ocr_lane_from_cfg(cfg: Config) -> Optional[OcrLane]:
+    ocr_cfg = cfg.ocr
+    if not ocr_cfg.enabled:
+        return None
+    return OcrLane(
+        engine=ocr_cfg.engine,
+        workers=ocr_cfg.workers,
+        max_pages=ocr_cfg.max_pages,
+        max_cpu_seconds=ocr_cfg.max_cpu_seconds,
+        cpu_per_page=ocr_cfg.cpu_per_page,
+    )
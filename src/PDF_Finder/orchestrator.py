@@ -2,10 +2,23 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
 import pathlib
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import httpx
 import pandas as pd
@@ -17,68 +30,260 @@ from .cache import (
     cache_path,
     read_cache_json,
     write_cache_json,
-    sanitize_filename,
-    load_yaml,
+    is_sharded,
+    pdf_path,
+    shard,
     ensure_dirs,
+    negative_cache_from_cfg,
+    NegativeCache,
+    normalize_doi,
+    is_projected,
+    project,
+    NO_OA,
+    TRANSIENT,
+)
+from .http import (
+    fetch_crossref,
+    fetch_unpaywall,
+    best_pdf_url,
+    download_pdf_status,
+    classify_error,
+    pdf_content_length,
 )
-from .http import fetch_crossref, fetch_unpaywall, best_pdf_url, download_pdf
-from .pdfops import search_pdf, move_pdf_atomic
+from .pdfops import scan_pdf, search_texts, merge_results, move_pdf_atomic
+from .pdfops import PageSplitter, page_splitter_from_cfg, link_or_copy, _same_content
+from .ocr import OcrLane, ocr_lane_from_cfg
+from .scheduler import HostScheduler, RateLimiter, SingleFlight, host_of, normalize_url
+from .snapshot import snapshot_for
+from .layout import manifest_for
+
+# run-wide coalescing of duplicate in-flight work (metadata, downloads, scans)
+_FLIGHTS = SingleFlight()
+
 
 # ruff formatting
-async def prepare_one(
+async def _lookup(
+    ns: str,
+    doi: str,
+    cfg: Config,
+    out_dir: pathlib.Path,
+    neg: Optional[NegativeCache],
+    fetch: Callable[[], Awaitable[Dict[str, Any]]],
+    empty: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Dict[str, Any]:
+    """
+    Cache → local snapshot index → negative cache → live fetch for one
+    metadata source (`ns`); snapshot misses and stale entries go live.
+    Failures are classified and recorded in the negative cache; `empty`
+    flags successful answers that are still a miss (e.g. no OA location),
+    so they get re-checked on the NO_OA schedule instead of being cached forever.
+    Concurrent lookups of the same DOI share one call.
+    """
+    key = (str(out_dir), ns, normalize_doi(doi))
+    return await _FLIGHTS.do(
+        key, lambda: _lookup_once(ns, doi, cfg, out_dir, neg, fetch, empty)
+    )
+
+
+async def _lookup_once(
+    ns: str,
+    doi: str,
+    cfg: Config,
+    out_dir: pathlib.Path,
+    neg: Optional[NegativeCache],
+    fetch: Callable[[], Awaitable[Dict[str, Any]]],
+    empty: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Dict[str, Any]:
+    log = logging.getLogger("harvest")
+    cache_en = cfg.cache.enabled
+    force_ref = cfg.cache.force_refresh
+    path = cache_path(out_dir, ns, doi, is_sharded(cfg))
+
+    retry_due = neg is not None and not force_ref and neg.due(doi, ns)
+    data = read_cache_json(path) if (cache_en and not force_ref and not retry_due) else None
+    if data is not None:
+        if data and not is_projected(data):
+            # raw payload from an older cache: project it once, on first read
+            data = _store(ns, doi, cfg, out_dir, data)
+        return data
+    snap, max_age = snapshot_for(out_dir, cfg, ns)
+    if snap is not None and not force_ref:
+        data = snap.get(doi, max_age)
+        if data is not None:
+            return project(ns, data)
+    kind = neg.blocked(doi, ns) if (neg is not None and not force_ref) else None
+    if kind:
+        log.debug(f"Skipping {ns} {doi}: {kind} (negative cache)")
+        return {}
+
+    try:
+        data = await fetch()
+    except Exception as e:
+        kind = classify_error(e)
+        if kind is None:
+            log.warning(f"{ns} rejected the request for {doi}: {e}")
+        elif neg is not None:
+            neg.record(doi, ns, kind)
+        return {}
+    if cache_en:
+        data = _store(ns, doi, cfg, out_dir, data)
+    else:
+        data = project(ns, data)
+    if neg is not None:
+        if empty is not None and empty(data):
+            neg.record(doi, ns, NO_OA)
+        else:
+            neg.clear(doi, ns)
+    return data
+
+
+def _store(
+    ns: str, doi: str, cfg: Config, out_dir: pathlib.Path, raw: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Cache the compact projection of `raw` (and `raw` itself with cache.keep_raw)."""
+    sharded = is_sharded(cfg)
+    if cfg.cache.keep_raw:
+        write_cache_json(cache_path(out_dir, f"{ns}_raw", doi, sharded), raw)
+    data = project(ns, raw)
+    write_cache_json(cache_path(out_dir, ns, doi, sharded), data)
+    return data
+
+
+async def _paced(
+    limiter: Optional[RateLimiter], fetch: Callable[[], Awaitable[Any]]
+) -> Any:
+    if limiter is not None:
+        await limiter.wait()
+    return await fetch()
+
+
+def _branch_timeout(cfg: Config, key: str) -> Optional[float]:
+    t = float(getattr(cfg.timeouts, key) or 0)
+    return t if t > 0 else None
+
+
+async def _crossref(
     doi: str,
-    cfg: Dict[str, Any],
+    cfg: Config,
     api_client: httpx.AsyncClient,
-    pdf_client: httpx.AsyncClient,
     out_dir: pathlib.Path,
+    neg: Optional[NegativeCache],
+    limiter: Optional[RateLimiter] = None,
 ) -> Dict[str, Any]:
+    t = _branch_timeout(cfg, "metadata")
+    return await _lookup(
+        "crossref",
+        doi,
+        cfg,
+        out_dir,
+        neg,
+        lambda: _paced(
+            limiter, lambda: asyncio.wait_for(fetch_crossref(api_client, doi), t)
+        ),
+    )
+
+
+async def _unpaywall(
+    doi: str,
+    cfg: Config,
+    api_client: httpx.AsyncClient,
+    out_dir: pathlib.Path,
+    neg: Optional[NegativeCache],
+    limiter: Optional[RateLimiter] = None,
+) -> Dict[str, Any]:
+    t = _branch_timeout(cfg, "metadata")
+    return await _lookup(
+        "unpaywall",
+        doi,
+        cfg,
+        out_dir,
+        neg,
+        lambda: _paced(
+            limiter,
+            lambda: asyncio.wait_for(
+                fetch_unpaywall(api_client, doi, cfg.email), t
+            ),
+        ),
+        empty=lambda ua: not best_pdf_url(ua),
+    )
+
+
+async def _stage_pdf(
+    doi: str,
+    pdf_url: str,
+    cfg: Config,
+    pdf_client: httpx.AsyncClient,
+    out_dir: pathlib.Path,
+    neg: Optional[NegativeCache],
+    scheduler: Optional[HostScheduler] = None,
+) -> str:
     """
-    Stage 1 for a DOI:
-      - Load or fetch Crossref + Unpaywall
-      - If OA PDF URL exists, download to downloads/ (staging folder)
-      - Return a record with: metadata, OA status, temp pdf path (if any)
+    Download `pdf_url` into downloads/ (staging folder); returns the staged path or "".
+    Concurrent downloads of the same URL share one transfer; DOIs that share the
+    URL get a hard link (or copy) of the file instead of downloading it again.
+    A PDF already routed to found/ or notfound/ (e.g. by a job with other
+    needles) is staged again from that copy.
     """
     log = logging.getLogger("harvest")
-    cache_en = bool(cfg.get("cache", {}).get("enabled", True))
-    force_ref = bool(cfg.get("cache", {}).get("force_refresh", False))
-    downloads = out_dir / cfg["folders"]["downloads"]
-    # cache files
-    xref_cache = cache_path(out_dir, "crossref", doi)
-    upw_cache = cache_path(out_dir, "unpaywall", doi)
-
-    # cached?
-    meta = read_cache_json(xref_cache) if (cache_en and not force_ref) else None
-    oa = read_cache_json(upw_cache) if (cache_en and not force_ref) else None
-
-    if meta is None:
+    force_ref = cfg.cache.force_refresh
+    sharded = is_sharded(cfg)
+    tgt = pdf_path(out_dir / cfg.folders.downloads, doi, sharded)
+    if tgt.exists() and not force_ref:
+        return str(tgt)
+    if not force_ref:
+        for folder in (cfg.folders.found, cfg.folders.notfound):
+            routed = pdf_path(out_dir / folder, doi, sharded)
+            if not routed.exists():
+                continue
+            try:
+                link_or_copy(routed, tgt)
+                log.debug(f"Re-staged {doi} from {routed}")
+                return str(tgt)
+            except OSError as e:
+                log.warning(f"Cannot re-stage {routed}: {e}")
+    skip = neg.blocked(doi, "pdf") if (neg is not None and not force_ref) else None
+    if skip:
+        log.debug(f"Skipping download {doi}: {skip} (negative cache)")
+        return ""
+
+    t = _branch_timeout(cfg, "download")
+
+    async def download() -> Tuple[Optional[str], pathlib.Path]:
         try:
-            meta = await fetch_crossref(api_client, doi)
-            if cache_en:
-                write_cache_json(xref_cache, meta)
-        except Exception:
-            meta = {}
-    if oa is None:
+            if scheduler is not None:
+                async with scheduler.slot(pdf_url):
+                    fail = await asyncio.wait_for(
+                        download_pdf_status(pdf_client, pdf_url, tgt), t
+                    )
+            else:
+                fail = await asyncio.wait_for(
+                    download_pdf_status(pdf_client, pdf_url, tgt), t
+                )
+        except asyncio.TimeoutError:
+            log.warning(f"PDF download timed out after {t}s {pdf_url}")
+            fail = TRANSIENT
+        return fail, tgt
+
+    key = (str(out_dir), "pdf", normalize_url(pdf_url))
+    fail, got = await _FLIGHTS.do(key, download)
+    if fail is None and got != tgt:
         try:
-            oa = await fetch_unpaywall(api_client, doi, cfg["email"])
-            if cache_en:
-                write_cache_json(upw_cache, oa)
-        except Exception:
-            oa = {}
+            link_or_copy(got, tgt)
+            log.debug(f"Shared download {pdf_url}: {got.name} → {tgt.name}")
+        except OSError as e:
+            log.warning(f"Cannot share {got} with {doi}: {e}")
+            fail = TRANSIENT
+    if fail is None:
+        if neg is not None:
+            neg.clear(doi, "pdf")
+        return str(tgt)
+    if neg is not None:
+        neg.record(doi, "pdf", fail)
+    return ""
 
-    pdf_url = best_pdf_url(oa)
-    temp_pdf = ""
-    if pdf_url:
-        # Always stage to downloads/ first
-        fname = f"{sanitize_filename(doi)}.pdf"
-        tgt = downloads / fname
-        if tgt.exists() and not force_ref:
-            temp_pdf = str(tgt)
-        else:
-            ok = await download_pdf(pdf_client, pdf_url, tgt)
-            if ok:
-                temp_pdf = str(tgt)
 
-    # flatten some meta now
+def flatten_meta(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Report fields from a Crossref `message`."""
     title = "; ".join(meta.get("title", []) or [])
     journal = "; ".join(meta.get("container-title", []) or [])
     try:
@@ -89,9 +294,7 @@ async def prepare_one(
         f"{a.get('given', '')} {a.get('family', '')}".strip()
         for a in (meta.get("author", []) or [])
     )
-
-    row = {
-        "doi": doi,
+    return {
         "title": title,
         "journal": journal,
         "year": year,
@@ -99,6 +302,83 @@ async def prepare_one(
         "publisher": meta.get("publisher", ""),
         "type": meta.get("type", ""),
         "crossref_url": meta.get("URL", ""),
+    }
+
+
+async def prepare_one(
+    doi: str,
+    cfg: Config,
+    api_client: httpx.AsyncClient,
+    pdf_client: httpx.AsyncClient,
+    out_dir: pathlib.Path,
+    scheduler: Optional[HostScheduler] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> Dict[str, Any]:
+    """
+    Stage 1 for a DOI, as two concurrent branches:
+      - Unpaywall lookup → as soon as an OA PDF URL is known, download it to
+        downloads/ (staging folder), through the per-host `scheduler` if given
+      - Crossref lookup → flatten the report fields (runs alongside the download)
+    Lookups skip recorded dead ends; each branch has its own timeouts
+    (timeouts.metadata / timeouts.download) and both are cancelled together.
+    `limit` (one slot per DOI) is held only while the lookups run, so the
+    download waits on the scheduler without keeping other DOIs' lookups out.
+    Returns a record with: metadata, OA status, temp pdf path (if any)
+    """
+    log = logging.getLogger("harvest")
+    neg = negative_cache_from_cfg(out_dir, cfg)
+    if is_sharded(cfg):
+        manifest_for(out_dir).add(doi)  # hashed names stay reversible to the DOI
+
+    if limit is not None:
+        await limit.acquire()
+    lookups_left = 2 if limit is not None else 0
+
+    def lookup_done():
+        nonlocal lookups_left
+        lookups_left -= 1
+        if lookups_left == 0:
+            limit.release()
+
+    async def crossref_branch():
+        try:
+            meta = await _crossref(doi, cfg, api_client, out_dir, neg)
+        finally:
+            if limit is not None:
+                lookup_done()
+        return flatten_meta(meta)
+
+    async def oa_branch():
+        try:
+            oa = await _unpaywall(doi, cfg, api_client, out_dir, neg)
+        finally:
+            if limit is not None:
+                lookup_done()
+        pdf_url = best_pdf_url(oa)
+        temp_pdf = ""
+        if pdf_url:
+            temp_pdf = await _stage_pdf(
+                doi, pdf_url, cfg, pdf_client, out_dir, neg, scheduler
+            )
+        return oa, pdf_url, temp_pdf
+
+    branches = [
+        asyncio.ensure_future(crossref_branch()),
+        asyncio.ensure_future(oa_branch()),
+    ]
+    try:
+        fields, (oa, pdf_url, temp_pdf) = await asyncio.gather(*branches)
+    finally:
+        for t in branches:
+            t.cancel()  # no-op once a branch has finished
+        if lookups_left > 0:
+            # cancelled before a branch got to run: hand the slot back here
+            lookups_left = 0
+            limit.release()
+
+    row = {
+        "doi": doi,
+        **fields,
         "is_oa": oa.get("is_oa", None),
         "oa_license": (oa.get("best_oa_location") or {}).get("license", None),
         "pdf_url": pdf_url or "",
@@ -115,160 +395,557 @@ async def prepare_one(
 # ---------------- Stage 2: process + route to found/notfound ----------------
 
 
+def _apply_match(r: Dict[str, Any], res: Dict[str, Any]):
+    r["match_found"] = bool(res.get("found"))
+    r["matched_strings"] = ", ".join(res.get("matches", []))
+    r["match_pages"] = ", ".join(map(str, res.get("pages", [])))
+
+
+def _route(
+    r: Dict[str, Any],
+    found_dir: pathlib.Path,
+    notfound_dir: pathlib.Path,
+    sharded: bool = False,
+):
+    # move the staged file according to match flag
+    log = logging.getLogger("harvest")
+    src = pathlib.Path(r["pdf_temp_path"])
+    if not src.exists():
+        return  # might have been moved already on a previous run
+    # A PDF routed earlier (service job with other needles) stays where it is:
+    # found/notfound reflect the first routing; this row and the match cache
+    # carry the result for its own needles.
+    for folder in (found_dir, notfound_dir):
+        routed = folder / shard(r["doi"]) / src.name if sharded else folder / src.name
+        if routed.exists() and _same_content(src, routed):
+            src.unlink()
+            r["pdf_final_path"] = str(routed)
+            r["pdf_temp_path"] = ""
+            log.debug(f"{r['doi']} already routed | {routed}")
+            return
+    dest_dir = found_dir if r["match_found"] else notfound_dir
+    if sharded:
+        final_path = move_pdf_atomic(src, dest_dir / shard(r["doi"]), unique=True)
+    else:
+        final_path = move_pdf_atomic(src, dest_dir)
+    r["pdf_final_path"] = str(final_path)
+    # wipe temp path so re-runs won't try to move again
+    r["pdf_temp_path"] = ""
+    log.debug(
+        f"Routed {r['doi']} → {'FOUND' if r['match_found'] else 'NOTFOUND'} | {final_path.name}"
+    )
+
+
 async def process_batch_pdfs(
-    rows: List[Dict[str, Any]], cfg: Dict[str, Any], out_dir: pathlib.Path
+    rows: List[Dict[str, Any]],
+    cfg: Config,
+    out_dir: pathlib.Path,
+    ocr: Optional[OcrLane] = None,
+    splitter: Optional[PageSplitter] = None,
+    ocr_tasks: Optional[List["asyncio.Task[None]"]] = None,
 ):
     """
     For the batch's rows that have a staged PDF:
-      - Search each PDF (thread executor)
+      - Search each PDF (thread executor); PDFs above pdf.split_pages are
+        scanned as page slices by the `splitter` process pool
+      - PDFs without a text hit but with image-only pages go to the `ocr` lane
+        (process pool, own budget); their routing waits for OCR, the rest does not.
+        With `ocr_tasks` those rows are finished by tasks appended to it instead
+        of before returning, so a slow OCR job does not hold up the next batch
       - Depending on hit, move the file to output_found/ or output_notfound/
       - Update rows in-place with match info & final path
-      - Cache match results (so re-runs are fast)
+      - Cache match results and OCR text (so re-runs are fast)
     """
     log = logging.getLogger("harvest")
-    needles = cfg.get("strings", [])
-    cache_en = bool(cfg.get("cache", {}).get("enabled", True))
-    force_ref = bool(cfg.get("cache", {}).get("force_refresh", False))
+    needles = cfg.strings
+    cache_en = cfg.cache.enabled
+    force_ref = cfg.cache.force_refresh
 
-    found_dir = out_dir / cfg["folders"]["found"]
-    notfound_dir = out_dir / cfg["folders"]["notfound"]
+    found_dir = out_dir / cfg.folders.found
+    notfound_dir = out_dir / cfg.folders.notfound
+    sharded = is_sharded(cfg)
 
     # Build tasks only for rows with a temp PDF and not cached match (unless force_refresh)
     to_process = []
     for r in rows:
         if not r.get("pdf_temp_path"):  # nothing to process
             continue
-        m_cache = cache_path(out_dir, "matches", r["doi"])
+        m_cache = cache_path(out_dir, "matches", r["doi"], sharded)
         cached = read_cache_json(m_cache) if (cache_en and not force_ref) else None
+        if cached is not None and cached.get("strings") != list(needles):
+            cached = None  # scanned for other needles (or before they were recorded)
         to_process.append((r, m_cache, cached))
 
     loop = asyncio.get_running_loop()
-    # run PDF parsing concurrently in thread pool
+    scan = splitter.scan if splitter is not None else scan_pdf
+    # run PDF parsing concurrently in thread pool; one scan per PDF URL and needles
     futs = []
     for r, m_cache, cached in to_process:
         if cached is not None:
-            r["match_found"] = bool(cached.get("found"))
-            r["matched_strings"] = ", ".join(cached.get("matches", []))
-            r["match_pages"] = ", ".join(map(str, cached.get("pages", [])))
+            _apply_match(r, cached)
             continue
+        src = pathlib.Path(r["pdf_temp_path"])
+        url = normalize_url(r["pdf_url"]) if r.get("pdf_url") else str(src)
         futs.append(
-            loop.run_in_executor(
-                None, search_pdf, pathlib.Path(r["pdf_temp_path"]), needles
+            asyncio.ensure_future(
+                _FLIGHTS.do(
+                    (str(out_dir), "scan", url, tuple(needles)),
+                    lambda src=src: loop.run_in_executor(None, scan, src, needles),
+                )
             )
         )
 
+    # rows staged at the same path (duplicate DOIs) share one routed file
+    routed: Dict[str, str] = {}
+
+    def route(r: Dict[str, Any]):
+        src = r["pdf_temp_path"]
+        if src in routed:
+            r["pdf_final_path"], r["pdf_temp_path"] = routed[src], ""
+            return
+        _route(r, found_dir, notfound_dir, sharded)
+        if r["pdf_final_path"]:
+            routed[src] = r["pdf_final_path"]
+
     # collect fresh parsing results in the same order
     idx = 0
+    pending_ocr = []
     for r, m_cache, cached in to_process:
-        if cached is not None:
-            # will move below based on cached result
-            pass
-        else:
-            res = await futs[idx]
+        if cached is None:
+            res, textless = await futs[idx]
             idx += 1
-            r["match_found"] = bool(res.get("found"))
-            r["matched_strings"] = ", ".join(res.get("matches", []))
-            r["match_pages"] = ", ".join(map(str, res.get("pages", [])))
-            if cache_en:
+            res, textless = dict(res), list(textless)  # may be shared with other rows
+            res["strings"] = list(needles)
+            cache_res = cache_en
+            if not res["found"] and textless and ocr is not None:
+                o_cache = cache_path(out_dir, "ocr", r["doi"], sharded)
+                texts = {
+                    int(k): v
+                    for k, v in ((read_cache_json(o_cache) or {}) if cache_en else {}).items()
+                }
+                todo = [p for p in textless if p not in texts]
+                fut = ocr.submit(pathlib.Path(r["pdf_temp_path"]), todo)
+                if fut is not None:
+                    pending_ocr.append((r, m_cache, res, o_cache, texts, textless, fut))
+                    continue
+                res = merge_results(res, search_texts(texts, needles))
+                # OCR budget spent: keep the result out of the cache so a later run can OCR
+                cache_res = cache_en and not todo
+            _apply_match(r, res)
+            if cache_res:
                 write_cache_json(m_cache, res)
+        route(r)
 
-        # move the staged file according to match flag
-        src = pathlib.Path(r["pdf_temp_path"])
-        if not src.exists():
-            continue  # might have been moved already on a previous run
-        dest_dir = found_dir if r["match_found"] else notfound_dir
-        final_path = move_pdf_atomic(src, dest_dir)
-        r["pdf_final_path"] = str(final_path)
-        # wipe temp path so re-runs won't try to move again
-        r["pdf_temp_path"] = ""
-        log.debug(
-            f"Routed {r['doi']} → {'FOUND' if r['match_found'] else 'NOTFOUND'} | {final_path.name}"
+    # OCR'd PDFs: merge page text into the result, then route
+    async def finish_ocr(r, m_cache, res, o_cache, texts, textless, fut):
+        try:
+            texts.update((await fut)["texts"])
+            if cache_en:
+                write_cache_json(o_cache, texts)
+            # the lane may have OCR'd only the first pages within its budget
+            done = all(p in texts for p in textless)
+        except Exception as e:
+            log.warning(f"OCR failed {r['doi']}: {e}")
+            done = False
+        res = merge_results(res, search_texts(texts, needles))
+        res["ocr_pages"] = sorted(texts)
+        _apply_match(r, res)
+        if cache_en and done:
+            write_cache_json(m_cache, res)
+        route(r)
+
+    finishing = [asyncio.ensure_future(finish_ocr(*p)) for p in pending_ocr]
+    if ocr_tasks is not None:
+        ocr_tasks.extend(finishing)
+    elif finishing:
+        await asyncio.gather(*finishing)
+
+
+# ---------------- Prefetch: metadata only, warms the caches ----------------
+
+
+async def prefetch_one(
+    doi: str,
+    cfg: Config,
+    api_client: httpx.AsyncClient,
+    out_dir: pathlib.Path,
+    limiters: Optional[Dict[str, RateLimiter]] = None,
+) -> Dict[str, Any]:
+    """
+    Metadata half of prepare_one: load or fetch Crossref + Unpaywall (cache hits
+    are not paced) and return the report fields plus OA status and PDF URL.
+    """
+    limiters = limiters or {}
+    neg = negative_cache_from_cfg(out_dir, cfg)
+    if is_sharded(cfg):
+        manifest_for(out_dir).add(doi)  # hashed names stay reversible to the DOI
+    meta, oa = await asyncio.gather(
+        _crossref(doi, cfg, api_client, out_dir, neg, limiters.get("crossref")),
+        _unpaywall(doi, cfg, api_client, out_dir, neg, limiters.get("unpaywall")),
+    )
+    pdf_url = best_pdf_url(oa)
+    return {
+        "doi": doi,
+        **flatten_meta(meta),
+        "is_oa": oa.get("is_oa", None),
+        "oa_license": (oa.get("best_oa_location") or {}).get("license", None),
+        "pdf_url": pdf_url or "",
+        "pdf_host": host_of(pdf_url) if pdf_url else "",
+        "pdf_bytes": None,
+    }
+
+
+async def prefetch(config: str | Path | Config):
+    """
+    Metadata-only pass (no PDF download or parsing):
+      - Fill the crossref/unpaywall caches at prefetch.concurrency, each API
+        paced to prefetch.rate_per_sec
+      - Optionally HEAD every OA PDF URL (prefetch.estimate_size) to size the harvest
+      - Write prefetch_report.xlsx/.csv and log PDF counts/volume per host
+    """
+    cfg = _load_config(config)
+    out_dir = _output_dir(cfg)
+
+    log = setup_logging(cfg, out_dir)
+    log.info("Starting metadata prefetch")
+    if not cfg.cache.enabled:
+        log.warning("cache.enabled is false: prefetch results will not be reused")
+
+    dois = _read_dois(cfg)
+    log.info(f"Loaded {len(dois)} DOIs")
+
+    concurrency = cfg.prefetch.concurrency
+    rate = cfg.prefetch.rate_per_sec
+    limiters = {"crossref": RateLimiter(rate), "unpaywall": RateLimiter(rate)}
+    sem = asyncio.Semaphore(concurrency)
+
+    async with (
+        httpx.AsyncClient(**_client_kwargs(cfg)) as api_client,
+        httpx.AsyncClient(**_client_kwargs(cfg)) as pdf_client,
+    ):
+
+        async def one(doi):
+            async with sem:
+                return await prefetch_one(doi, cfg, api_client, out_dir, limiters)
+
+        rows = await tqdm_asyncio.gather(
+            *(one(doi) for doi in dois), total=len(dois), desc="Prefetch: metadata"
         )
 
+        if cfg.prefetch.estimate_size:
+            scheduler = _make_scheduler(cfg, concurrency) or HostScheduler(concurrency)
+
+            async def size(row):
+                async with scheduler.slot(row["pdf_url"]):
+                    row["pdf_bytes"] = await pdf_content_length(
+                        pdf_client, row["pdf_url"]
+                    )
+
+            with_pdf = [r for r in rows if r["pdf_url"]]
+            await tqdm_asyncio.gather(
+                *(size(r) for r in with_pdf), total=len(with_pdf), desc="Prefetch: sizes"
+            )
+
+    out_df = _write_report(rows, out_dir, "prefetch_report")
+    with_pdf = out_df[out_df["pdf_url"] != ""] if len(out_df) else out_df
+    log.info(f"Prefetch done: {len(with_pdf)}/{len(out_df)} DOIs have an OA PDF URL")
+    if len(with_pdf):
+        for host, n in with_pdf["pdf_host"].value_counts().head(10).items():
+            log.info(f"  {host}: {n} PDFs")
+        known = with_pdf["pdf_bytes"].dropna()
+        if len(known):
+            est = known.mean() * len(with_pdf)
+            log.info(
+                f"Estimated download volume: {est / 1e9:.2f} GB "
+                f"({len(known)}/{len(with_pdf)} sizes known)"
+            )
+    log.info(f"Prefetch report → {out_dir / 'prefetch_report.xlsx'}")
+    return out_df
+
+
+# ---------------- shared run setup ----------------
+
+
+def _load_config(config: str | Path | Config) -> Config:
+    return config if isinstance(config, Config) else Config.from_yaml(config)
+
+
+def _output_dir(cfg: Config) -> pathlib.Path:
+    out_dir = pathlib.Path(cfg.output_dir).resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ensure_dirs(out_dir, cfg)
+    return out_dir
+
+
+def _read_dois(cfg: Config) -> List[str]:
+    df = pd.read_excel(cfg.input_excel)
+    doi_col = cfg.doi_column
+    if doi_col not in df.columns:
+        raise ValueError(f"Excel must contain column '{doi_col}'")
+    return [str(x).strip() for x in df[doi_col].dropna().tolist()]
+
+
+def _client_kwargs(cfg: Config) -> Dict[str, Any]:
+    headers = {"User-Agent": cfg.http.user_agent or f"doi-harvest/2.0 (+{cfg.email})"}
+    limits = httpx.Limits(
+        max_keepalive_connections=cfg.http.max_keepalive,
+        max_connections=cfg.http.max_connections,
+    )
+    timeout = httpx.Timeout(cfg.timeouts.read, connect=cfg.timeouts.connect)
+    return dict(headers=headers, limits=limits, timeout=timeout, http2=True)
+
+
+def _make_scheduler(cfg: Config, max_active: int) -> Optional[HostScheduler]:
+    sched_cfg = cfg.scheduler
+    if not sched_cfg.enabled:
+        return None
+    return HostScheduler(
+        max_active=max_active,
+        per_host=sched_cfg.per_host,
+        min_per_host=sched_cfg.min_per_host,
+        slow_after=sched_cfg.slow_after,
+    )
+
+
+def _write_report(
+    rows: List[Dict[str, Any]], out_dir: pathlib.Path, stem: str
+) -> pd.DataFrame:
+    out_df = pd.DataFrame(rows)
+    out_df.to_excel(out_dir / f"{stem}.xlsx", index=False)
+    out_df.to_csv(out_dir / f"{stem}.csv", index=False, encoding="utf-8")
+    return out_df
+
+
+# ---------------- streaming library API ----------------
+
+
+_STAGING: Dict[Tuple[str, str], List[Any]] = {}  # (out_dir, DOI) → [lock, users]
+
+
+@contextlib.asynccontextmanager
+async def _staging_lock(out_dir: pathlib.Path, doi: str) -> AsyncIterator[None]:
+    key = (str(out_dir), normalize_doi(doi))
+    entry = _STAGING.setdefault(key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _STAGING[key]
+
+
+async def _harvest_one(
+    doi: str,
+    cfg: Config,
+    api_client: httpx.AsyncClient,
+    pdf_client: httpx.AsyncClient,
+    out_dir: pathlib.Path,
+    scheduler: Optional[HostScheduler],
+    ocr: Optional[OcrLane],
+    splitter: Optional[PageSplitter] = None,
+) -> Dict[str, Any]:
+    """
+    prepare → scan → route one DOI. Duplicates in flight with the same needles
+    share one run; runs for other needles wait, as they stage the same file.
+    """
+
+    async def once() -> Dict[str, Any]:
+        async with _staging_lock(out_dir, doi):
+            row = await prepare_one(doi, cfg, api_client, pdf_client, out_dir, scheduler)
+            await process_batch_pdfs([row], cfg, out_dir, ocr, splitter)
+            return row
+
+    key = (str(out_dir), "doi", normalize_doi(doi), tuple(cfg.strings))
+    return dict(await _FLIGHTS.do(key, once))
+
+
+async def _harvest_or_error(doi: str, *args: Any) -> Dict[str, Any]:
+    # one failing DOI becomes an error row instead of ending the whole stream
+    try:
+        return await _harvest_one(doi, *args)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logging.getLogger("harvest").warning(f"Harvest of {doi} failed: {e}")
+        return {"doi": doi, "error": str(e)}
+
+
+async def _aiter(items: Iterable[str]) -> AsyncIterator[str]:
+    for item in items:
+        yield item
+
+
+async def harvest(
+    dois: AsyncIterable[str] | Iterable[str],
+    config: Config,
+    api_client: Optional[httpx.AsyncClient] = None,
+    pdf_client: Optional[httpx.AsyncClient] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Library entry point: stream one report row per DOI as soon as it is done
+    (completion order, not input order).
+      - At most config.concurrency DOIs are in flight; the next DOI is pulled
+        from `dois` only when a slot frees up (backpressure on the producer)
+      - Each DOI goes prepare → download → scan → route on its own, so a slow
+        download never holds back rows that are already finished
+      - A DOI that fails unexpectedly yields {"doi", "error"} instead of
+        ending the stream
+      - Clients passed in are used as-is and left open; missing ones are created
+        from the config and closed on exit
+    Closing the generator early (break / aclose()) cancels the DOIs in flight.
+    """
+    cfg = config
+    out_dir = _output_dir(cfg)
+    limit = max(1, cfg.concurrency)
+    scheduler = _make_scheduler(cfg, limit)
+    source = (dois if isinstance(dois, AsyncIterable) else _aiter(dois)).__aiter__()
 
-async def run(cfg_path: str):
+    async def next_doi() -> str:
+        return str(await source.__anext__()).strip()
+
+    async with contextlib.AsyncExitStack() as stack:
+        if api_client is None:
+            api_client = await stack.enter_async_context(
+                httpx.AsyncClient(**_client_kwargs(cfg))
+            )
+        if pdf_client is None:
+            pdf_client = await stack.enter_async_context(
+                httpx.AsyncClient(**_client_kwargs(cfg))
+            )
+        ocr = ocr_lane_from_cfg(cfg)
+        if ocr is not None:
+            stack.callback(ocr.close)
+        splitter = page_splitter_from_cfg(cfg)
+        if splitter is not None:
+            stack.callback(splitter.close)
+
+        work: Set["asyncio.Future[Dict[str, Any]]"] = set()
+        feeder: Optional["asyncio.Future[str]"] = None
+        exhausted = False
+        try:
+            while True:
+                if feeder is None and not exhausted and len(work) < limit:
+                    feeder = asyncio.ensure_future(next_doi())
+                waiting = work | ({feeder} if feeder is not None else set())
+                if not waiting:
+                    break
+                done, _ = await asyncio.wait(
+                    waiting, return_when=asyncio.FIRST_COMPLETED
+                )
+                if feeder in done:
+                    try:
+                        doi = feeder.result()
+                    except StopAsyncIteration:
+                        exhausted = True
+                    else:
+                        if doi:
+                            work.add(
+                                asyncio.ensure_future(
+                                    _harvest_or_error(
+                                        doi, cfg, api_client, pdf_client,
+                                        out_dir, scheduler, ocr, splitter,
+                                    )
+                                )
+                            )
+                    feeder = None
+                for t in done & work:
+                    work.discard(t)
+                    yield t.result()
+        finally:
+            leftover = work | ({feeder} if feeder is not None else set())
+            for t in leftover:
+                t.cancel()
+            await asyncio.gather(*leftover, return_exceptions=True)
+
+
+async def run(config: str | Path | Config):
     """
     Batch orchestrator:
       - Read config + Excel DOIs
       - For DOIs in chunks of batch_size:
           * Stage 1: concurrently prepare (metadata+OA) and download PDFs into downloads/
           * Stage 2: pause downloading; process batch PDFs and move to final folders
+            (OCR'd PDFs finish in the background and are routed when done)
       - Append results and write report.xlsx/.csv at the end (and optionally after each batch)
     """
-    cfg = load_yaml(cfg_path)
-    out_dir = pathlib.Path(cfg.get("output_dir", "output")).resolve()
-    out_dir.mkdir(parents=True, exist_ok=True)
-    ensure_dirs(out_dir, cfg)
+    cfg = _load_config(config)
+    out_dir = _output_dir(cfg)
 
     log = setup_logging(cfg, out_dir)
     log.info("Starting batched DOI harvest")
 
-    # input
-    df = pd.read_excel(cfg["input_excel"])
-    doi_col = cfg.get("doi_column", "doi")
-    if doi_col not in df.columns:
-        raise ValueError(f"Excel must contain column '{doi_col}'")
-    dois = [str(x).strip() for x in df[doi_col].dropna().tolist()]
+    dois = _read_dois(cfg)
     log.info(f"Loaded {len(dois)} DOIs")
 
-    # HTTP clients (kept open across batches)
-    headers = {
-        "User-Agent": cfg.get("http", {}).get(
-            "user_agent", f"doi-harvest/2.0 (+{cfg.get('email', '')})"
-        )
-    }
-    limits = httpx.Limits(
-        max_keepalive_connections=int(cfg.get("http", {}).get("max_keepalive", 20)),
-        max_connections=int(cfg.get("http", {}).get("max_connections", 20)),
-    )
-    timeout = httpx.Timeout(
-        float(cfg.get("timeouts", {}).get("read", 30.0)),
-        connect=float(cfg.get("timeouts", {}).get("connect", 15.0)),
-    )
-    batch_size = int(cfg.get("batch_size", 5))
+    batch_size = cfg.batch_size
     # polite parallelism *within a batch* (metadata+downloads)
-    per_batch_concurrency = int(cfg.get("concurrency", min(batch_size, 6)))
+    per_batch_concurrency = cfg.concurrency
+    # downloads are throttled per PDF host (shared across batches, so host
+    # latencies learnt early keep steering later batches)
+    scheduler = _make_scheduler(cfg, per_batch_concurrency)
+    # opt-in OCR of image-only pages, in its own process pool and budget
+    ocr = ocr_lane_from_cfg(cfg)
+    # huge PDFs are scanned as page slices so they do not decide the batch time
+    splitter = page_splitter_from_cfg(cfg)
 
     all_rows: List[Dict[str, Any]] = []
-    async with (
-        httpx.AsyncClient(
-            headers=headers, limits=limits, timeout=timeout, http2=True
-        ) as api_client,
-        httpx.AsyncClient(
-            headers=headers, limits=limits, timeout=timeout, http2=True
-        ) as pdf_client,
-    ):
-        for start in range(0, len(dois), batch_size):
-            chunk = dois[start : start + batch_size]
-            log.info(f"Batch {start // batch_size + 1}: preparing {len(chunk)} DOIs")
-            sem = asyncio.Semaphore(per_batch_concurrency)
-
-            # ------ Stage 1: prepare+download (bounded concurrency), staged into downloads/ ------
-            async def prep_wrapped(doi):
-                async with sem:
-                    return await prepare_one(doi, cfg, api_client, pdf_client, out_dir)
-
-            prep_tasks = [prep_wrapped(doi) for doi in chunk]
-            rows = await tqdm_asyncio.gather(
-                *prep_tasks, total=len(prep_tasks), desc="Stage 1: prepare+download"
-            )
+    ocr_tasks: List["asyncio.Task[None]"] = []
+    try:
+        async with (
+            httpx.AsyncClient(**_client_kwargs(cfg)) as api_client,
+            httpx.AsyncClient(**_client_kwargs(cfg)) as pdf_client,
+        ):
+            for start in range(0, len(dois), batch_size):
+                chunk = dois[start : start + batch_size]
+                log.info(f"Batch {start // batch_size + 1}: preparing {len(chunk)} DOIs")
+                sem = asyncio.Semaphore(per_batch_concurrency)
+
+                # ------ Stage 1: prepare+download (bounded concurrency), staged into downloads/ ------
+                async def prep_wrapped(doi):
+                    if scheduler is not None:
+                        # `sem` bounds the metadata lookups, the scheduler the downloads;
+                        # holding `sem` for the download would let one slow host block
+                        # the batch
+                        return await prepare_one(
+                            doi, cfg, api_client, pdf_client, out_dir, scheduler, sem
+                        )
+                    async with sem:
+                        return await prepare_one(doi, cfg, api_client, pdf_client, out_dir)
+
+                prep_tasks = [prep_wrapped(doi) for doi in chunk]
+                rows = await tqdm_asyncio.gather(
+                    *prep_tasks, total=len(prep_tasks), desc="Stage 1: prepare+download"
+                )
+
+                # ------ Stage 2: processing (no network; only CPU and file moves) ------
+                log.info(f"Batch {start // batch_size + 1}: processing PDFs")
+                await process_batch_pdfs(rows, cfg, out_dir, ocr, splitter, ocr_tasks)
+
+                all_rows.extend(rows)
 
-            # ------ Stage 2: processing (no network; only CPU and file moves) ------
-            log.info(f"Batch {start // batch_size + 1}: processing PDFs")
-            await process_batch_pdfs(rows, cfg, out_dir)
+                # optional: write incremental report after each batch
+                if cfg.write_after_each_batch:
+                    out_df = _write_report(all_rows, out_dir, "report")
+                    log.info(f"Incremental report written: {len(out_df)} rows")
 
-            all_rows.extend(rows)
+            # OCR still running from the last batches: route those rows before the report
+            if ocr_tasks:
+                log.info(f"Waiting for {len(ocr_tasks)} OCR jobs")
+                await asyncio.gather(*ocr_tasks)
+    finally:
+        for t in ocr_tasks:
+            t.cancel()
+        if ocr is not None:
+            ocr.close()
+        if splitter is not None:
+            splitter.close()
 
-            # optional: write incremental report after each batch
-            if cfg.get("write_after_each_batch", True):
-                out_df = pd.DataFrame(all_rows)
-                out_df.to_excel(out_dir / "report.xlsx", index=False)
-                out_df.to_csv(out_dir / "report.csv", index=False, encoding="utf-8")
-                log.info(f"Incremental report written: {len(out_df)} rows")
+    if ocr is not None:
+        log.info(f"OCR: {ocr.pages_used} pages, {ocr.cpu_used:.1f} CPU-s")
 
     # final report
-    out_df = pd.DataFrame(all_rows)
-    out_df.to_excel(out_dir / "report.xlsx", index=False)
-    out_df.to_csv(out_dir / "report.csv", index=False, encoding="utf-8")
+    out_df = _write_report(all_rows, out_dir, "report")
     log.info(f"Done. Total rows: {len(out_df)} → {out_dir / 'report.xlsx'}")
     return out_df
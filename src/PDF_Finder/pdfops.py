@@ -1,50 +1,215 @@
 # pdfops.py
 from __future__ import annotations
 
+import filecmp
 import logging
+import mmap
+import multiprocessing
+import os
 import pathlib
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from pypdf import PdfReader
 
+from .config import Config
+
 # ruff formatting
 def search_pdf(pdf_path: pathlib.Path, needles: List[str]) -> Dict[str, Any]:
     """
-    Text search (casefolded substrings). If you need OCR later, add an opt-in pass here.
+    Text search (casefolded substrings). Image-only pages are skipped here;
+    see scan_pdf and ocr.OcrLane for the opt-in OCR pass.
+    """
+    return scan_pdf(pdf_path, needles)[0]
+
+
+def scan_pdf(
+    pdf_path: pathlib.Path, needles: List[str]
+) -> Tuple[Dict[str, Any], List[int]]:
+    """
+    search_pdf plus the (1-based) pages without any extractable text,
+    i.e. the candidates for OCR.
     """
-    res = {"found": False, "matches": [], "pages": []}
     try:
         reader = PdfReader(str(pdf_path))
-        ns = [n.casefold() for n in needles]
-        hits, pages = set(), set()
-        for i, p in enumerate(reader.pages):
-            try:
-                txt = (p.extract_text() or "").casefold()
-            except Exception:
-                txt = ""
-            if not txt:
-                continue
-            page_hit = False
-            for n in ns:
-                if n in txt:
-                    hits.add(n)
-                    page_hit = True
-            if page_hit:
-                pages.add(i + 1)
+    except Exception as e:
+        logging.getLogger("harvest").warning(f"PDF parse failed {pdf_path}: {e}")
+        return {"found": False, "matches": [], "pages": []}, []
+    return _scan_reader(reader, needles, pdf_path)
+
+
+def _scan_reader(
+    reader: PdfReader, needles: List[str], pdf_path: pathlib.Path
+) -> Tuple[Dict[str, Any], List[int]]:
+    # scan_pdf over an already open reader (PageSplitter has one to count pages)
+    res = {"found": False, "matches": [], "pages": []}
+    textless: List[int] = []
+    try:
+        hits, pages, textless = _scan_range(reader, needles, 0, len(reader.pages))
         if hits:
             res.update(found=True, matches=sorted(hits), pages=sorted(pages))
     except Exception as e:
         logging.getLogger("harvest").warning(f"PDF parse failed {pdf_path}: {e}")
-    return res
+    return res, textless
+
+
+def _scan_range(
+    reader: PdfReader, needles: List[str], start: int, stop: int
+) -> Tuple[List[str], List[int], List[int]]:
+    # (needles hit, 1-based pages with a hit, 1-based text-less pages) of pages[start:stop]
+    ns = [n.casefold() for n in needles]
+    hits, pages, textless = set(), set(), []
+    for i in range(start, stop):
+        try:
+            txt = (reader.pages[i].extract_text() or "").casefold()
+        except Exception:
+            txt = ""
+        if not txt.strip():
+            textless.append(i + 1)
+            continue
+        page_hit = False
+        for n in ns:
+            if n in txt:
+                hits.add(n)
+                page_hit = True
+        if page_hit:
+            pages.add(i + 1)
+    return sorted(hits), sorted(pages), textless
+
+
+def scan_page_range(
+    pdf_path: str, needles: List[str], start: int, stop: int
+) -> Tuple[List[str], List[int], List[int]]:
+    """
+    Worker-process entry point: scan pages[start:stop] of one PDF.
+    The file is memory-mapped, so workers share the page cache instead of
+    each reading its own copy of a large volume.
+    """
+    with open(pdf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return _scan_range(PdfReader(m), needles, start, stop)
+
+
+class PageSplitter:
+    """
+    Scans PDFs of at least `min_pages` pages as page slices in a process pool
+    (`workers` processes), so one huge volume does not keep a single worker
+    busy long after the rest of the batch is done. Smaller PDFs are scanned
+    in the calling thread exactly like scan_pdf. The pool starts on first use.
+    """
 
+    def __init__(self, workers: int = 4, min_pages: int = 300):
+        self.workers = max(1, int(workers))
+        self.min_pages = int(min_pages)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()  # scan() runs in several executor threads
 
-def move_pdf_atomic(src: pathlib.Path, dst_dir: pathlib.Path) -> pathlib.Path:
+    def scan(
+        self, pdf_path: pathlib.Path, needles: List[str]
+    ) -> Tuple[Dict[str, Any], List[int]]:
+        """Drop-in for scan_pdf (blocking; run it in a thread executor)."""
+        try:
+            reader = PdfReader(str(pdf_path))
+            n = len(reader.pages)
+        except Exception:
+            return scan_pdf(pdf_path, needles)  # logs the parse failure
+        if self.min_pages <= 0 or n < self.min_pages or self.workers < 2:
+            return _scan_reader(reader, needles, pdf_path)  # parsed once
+        with self._lock:
+            if self._pool is None:
+                self._pool = worker_pool(self.workers)
+            pool = self._pool
+        # a few slices per worker, so an uneven slice does not become the new tail
+        step = max(1, -(-n // (self.workers * 2)))
+        try:
+            futs = [
+                pool.submit(
+                    scan_page_range, str(pdf_path), needles, start, min(start + step, n)
+                )
+                for start in range(0, n, step)
+            ]
+            parts = [f.result() for f in futs]
+        except Exception as e:
+            logging.getLogger("harvest").warning(
+                f"Parallel scan failed {pdf_path}: {e}; scanning sequentially"
+            )
+            return _scan_reader(reader, needles, pdf_path)
+        hits = sorted({h for part in parts for h in part[0]})
+        pages = sorted({p for part in parts for p in part[1]})
+        textless = sorted(p for part in parts for p in part[2])
+        return {"found": bool(hits), "matches": hits, "pages": pages}, textless
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def worker_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool started with forkserver (spawn where unavailable): the harvest
+    process runs executor threads, and forking a threaded process can deadlock.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context(method)
+    )
+
+
+def page_splitter_from_cfg(cfg: Config) -> Optional[PageSplitter]:
+    pdf_cfg = cfg.pdf
+    if pdf_cfg.split_pages <= 0 or pdf_cfg.split_workers < 2:
+        return None
+    return PageSplitter(workers=pdf_cfg.split_workers, min_pages=pdf_cfg.split_pages)
+
+
+def search_texts(texts: Dict[int, str], needles: List[str]) -> Dict[str, Any]:
+    """Same search as search_pdf over already extracted {page: text} (e.g. OCR output)."""
+    ns = [n.casefold() for n in needles]
+    hits, pages = set(), set()
+    for page, txt in texts.items():
+        txt = (txt or "").casefold()
+        page_hit = False
+        for n in ns:
+            if n in txt:
+                hits.add(n)
+                page_hit = True
+        if page_hit:
+            pages.add(int(page))
+    return {"found": bool(hits), "matches": sorted(hits), "pages": sorted(pages)}
+
+
+def merge_results(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Union of two search results (text layer + OCR)."""
+    matches = sorted(set(a.get("matches", [])) | set(b.get("matches", [])))
+    pages = sorted(set(a.get("pages", [])) | set(b.get("pages", [])))
+    return {**a, "found": bool(matches), "matches": matches, "pages": pages}
+
+
+def move_pdf_atomic(
+    src: pathlib.Path, dst_dir: pathlib.Path, unique: bool = False
+) -> pathlib.Path:
     """
     Move a file atomically, preserving name; if collision, append a counter.
+    With `unique` the name is already collision-free (sharded layout), so the
+    move is O(1): no probing, and a re-run replaces its own earlier copy.
+    A file identical to the one already at the target takes its place instead
+    of becoming a `name_1.pdf` duplicate.
     """
     dst_dir.mkdir(parents=True, exist_ok=True)
     target = dst_dir / src.name
+    if target.exists() and _same_content(src, target):
+        if src.samefile(target):
+            src.unlink()  # a hard link of the target: rename() would leave both names
+        else:
+            src.replace(target)
+        return target
+    if unique:
+        return src.replace(target)
     if not target.exists():
         return src.replace(target)
     stem, suf = src.stem, src.suffix
@@ -54,3 +219,25 @@ def move_pdf_atomic(src: pathlib.Path, dst_dir: pathlib.Path) -> pathlib.Path:
         if not cand.exists():
             return src.replace(cand)
         k += 1
+
+
+def _same_content(a: pathlib.Path, b: pathlib.Path) -> bool:
+    try:
+        return a.samefile(b) or filecmp.cmp(a, b, shallow=False)
+    except OSError:
+        return False
+
+
+def link_or_copy(src: pathlib.Path, dst: pathlib.Path) -> pathlib.Path:
+    """
+    Give `dst` the content of `src` without downloading it again: a hard link
+    where the filesystem allows it, else a copy. `dst` appears atomically.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".part")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    return tmp.replace(dst)
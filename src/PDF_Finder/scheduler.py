@@ -0,0 +1,200 @@
+# scheduler.py
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+import urllib.parse
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+# ruff formatting
+def host_of(url: str) -> str:
+    return (urllib.parse.urlsplit(url).hostname or "").lower()
+
+
+def normalize_url(url: str) -> str:
+    """Lower-case scheme/host, default port and fragment dropped (path/query kept)."""
+    u = urllib.parse.urlsplit(url.strip())
+    scheme = u.scheme.lower()
+    host = (u.hostname or "").lower()
+    if u.port and (scheme, u.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{u.port}"
+    return urllib.parse.urlunsplit((scheme, host, u.path or "/", u.query, ""))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls by key: the first caller starts the work, later
+    callers with the same key await the same future and get the same result.
+    The work is cancelled only once every caller waiting on it is cancelled;
+    a finished key is forgotten, so the next call starts fresh.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, List[Any]] = {}  # key → [future, waiters]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None or call[0].get_loop() is not asyncio.get_running_loop():
+            fut = asyncio.ensure_future(fn())
+            call = self._calls[key] = [fut, 0]
+
+            def forget(f, key=key):
+                if key in self._calls and self._calls[key][0] is f:
+                    del self._calls[key]
+
+            fut.add_done_callback(forget)
+        fut = call[0]
+        call[1] += 1
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            if call[1] == 1 and not fut.done():
+                fut.cancel()  # last one waiting: nobody needs the result any more
+            raise
+        finally:
+            call[1] -= 1
+
+
+class RateLimiter:
+    """
+    Spaces calls evenly so that at most `rate` start per second (rate <= 0: unlimited).
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        delay = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class HostScheduler:
+    """
+    Fair-share slot scheduler for downloads, keyed by target host.
+
+      - at most `max_active` downloads run at once (all hosts together)
+      - at most `per_host` downloads run against one host
+      - waiting hosts are served round-robin, so one busy repository
+        cannot hold every slot while other hosts sit idle
+      - an EWMA of each host's latency shrinks its cap once it gets slower
+        than `slow_after` seconds (never below `min_per_host`)
+    """
+
+    def __init__(
+        self,
+        max_active: int = 5,
+        per_host: int = 2,
+        min_per_host: int = 1,
+        slow_after: float = 10.0,
+        alpha: float = 0.3,
+    ):
+        self.max_active = max(1, int(max_active))
+        self.per_host = max(1, int(per_host))
+        self.min_per_host = max(1, min(int(min_per_host), self.per_host))
+        self.slow_after = float(slow_after)
+        self.alpha = float(alpha)
+        self._active: Dict[str, int] = {}
+        self._latency: Dict[str, float] = {}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self._rr: Deque[str] = deque()
+        self._total = 0
+
+    def latency(self, host: str) -> Optional[float]:
+        return self._latency.get(host)
+
+    def host_limit(self, host: str) -> int:
+        lat = self._latency.get(host)
+        if lat is None or self.slow_after <= 0 or lat <= self.slow_after:
+            return self.per_host
+        return max(self.min_per_host, int(self.per_host * self.slow_after / lat))
+
+    def _dispatch(self):
+        # hand out free slots, one host at a time, in round-robin order
+        while self._total < self.max_active and self._rr:
+            for _ in range(len(self._rr)):
+                host = self._rr[0]
+                self._rr.rotate(-1)
+                q = self._waiters[host]
+                while q and q[0].done():  # cancelled while waiting
+                    q.popleft()
+                if not q:
+                    del self._waiters[host]
+                    self._rr.remove(host)
+                    break
+                if self._active.get(host, 0) < self.host_limit(host):
+                    q.popleft().set_result(None)
+                    self._active[host] = self._active.get(host, 0) + 1
+                    self._total += 1
+                    if not q:
+                        del self._waiters[host]
+                        self._rr.remove(host)
+                    break
+            else:
+                return  # every waiting host is at its cap
+
+    async def acquire(self, host: str):
+        fut = asyncio.get_running_loop().create_future()
+        if host not in self._waiters:
+            self._waiters[host] = deque()
+            self._rr.append(host)
+        self._waiters[host].append(fut)
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # slot was granted just before the cancellation landed
+                self.release(host)
+            else:
+                self._dispatch()
+            raise
+
+    def release(self, host: str, elapsed: Optional[float] = None):
+        self._active[host] -= 1
+        if not self._active[host]:
+            del self._active[host]
+        self._total -= 1
+        if elapsed is not None:
+            prev = self._latency.get(host)
+            self._latency[host] = (
+                elapsed if prev is None else prev + self.alpha * (elapsed - prev)
+            )
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[str]:
+        """
+        Hold one download slot for the host of `url` while the block runs.
+        """
+        host = host_of(url)
+        await self.acquire(host)
+        t0 = time.monotonic()
+        try:
+            yield host
+        finally:
+            self.release(host, time.monotonic() - t0)
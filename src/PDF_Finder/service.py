@@ -0,0 +1,322 @@
+# service.py
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import itertools
+import json
+import logging
+import pathlib
+import time
+import urllib.parse
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from .config import Config
+from .logging import setup_logging
+from .ocr import OcrLane, ocr_lane_from_cfg
+from .pdfops import page_splitter_from_cfg
+from .orchestrator import (
+    _client_kwargs,
+    _harvest_one,
+    _make_scheduler,
+    _output_dir,
+    _write_report,
+)
+
+QUEUED, RUNNING, DONE, CANCELLED = "queued", "running", "done", "cancelled"
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found"}
+
+
+# ruff formatting
+class Job:
+    """One submitted DOI list with its own needles, progress and report."""
+
+    def __init__(
+        self, job_id: str, dois: List[str], cfg: Config, ocr: Optional[OcrLane] = None
+    ):
+        self.id = job_id
+        self.cfg = cfg
+        self.ocr = ocr  # this job's OCR budget (ocr.max_pages / max_cpu_seconds)
+        self.total = len(dois)
+        self.pending: Deque[str] = deque(dois)
+        self.active = 0
+        self.rows: List[Dict[str, Any]] = []
+        self.status = QUEUED if dois else DONE
+        self.created = time.time()
+        self.finished: Optional[float] = None if dois else self.created
+        self.report = ""
+        self.done_event = asyncio.Event()
+        if not dois:
+            self.done_event.set()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "done": len(self.rows),
+            "found": sum(1 for r in self.rows if r.get("match_found")),
+            "strings": self.cfg.strings,
+            "created": self.created,
+            "finished": self.finished,
+            "report": self.report,
+        }
+
+
+class HarvestService:
+    """
+    Long-running harvester that accepts jobs (DOI list + needles):
+      - the two httpx clients, host scheduler, OCR and page-split pools stay warm;
+        the OCR budgets apply per job, not to the life of the service
+      - `service.concurrency` workers take DOIs from the active jobs round-robin,
+        so a small job is not queued behind a large one
+      - a DOI already in flight for the same needles is shared, not fetched twice
+      - each job tracks its progress and writes jobs/<id>/report.xlsx/.csv when done
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        api_client: Optional[httpx.AsyncClient] = None,
+        pdf_client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.cfg = config
+        self.api_client = api_client
+        self.pdf_client = pdf_client
+        self.out_dir = _output_dir(config)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._rr: Deque[Job] = deque()
+        self._cond = asyncio.Condition()
+        self._stack = contextlib.AsyncExitStack()
+        self._workers: List[asyncio.Task] = []
+        self.scheduler = None
+        self.ocr = None
+        self.splitter = None
+
+    async def start(self):
+        stack = self._stack
+        if self.api_client is None:
+            self.api_client = await stack.enter_async_context(
+                httpx.AsyncClient(**_client_kwargs(self.cfg))
+            )
+        if self.pdf_client is None:
+            self.pdf_client = await stack.enter_async_context(
+                httpx.AsyncClient(**_client_kwargs(self.cfg))
+            )
+        n = max(1, self.cfg.service.concurrency)
+        self.scheduler = _make_scheduler(self.cfg, n)
+        self.ocr = ocr_lane_from_cfg(self.cfg)
+        if self.ocr is not None:
+            stack.callback(self.ocr.close)
+        self.splitter = page_splitter_from_cfg(self.cfg)
+        if self.splitter is not None:
+            stack.callback(self.splitter.close)
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(n)]
+
+    async def close(self):
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self._stack.aclose()
+
+    async def __aenter__(self) -> "HarvestService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ---------------- jobs ----------------
+
+    async def submit(self, dois: List[str], strings: Optional[List[str]] = None) -> Job:
+        dois = [str(d).strip() for d in dois if str(d).strip()]
+        needles = self.cfg.strings if strings is None else [str(s) for s in strings]
+        cfg = dataclasses.replace(self.cfg, strings=needles)
+        ocr = self.ocr.for_job() if self.ocr is not None else None
+        job = Job(str(next(self._ids)), dois, cfg, ocr)
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        if dois:
+            async with self._cond:
+                self._rr.append(job)
+                self._cond.notify(len(dois))
+        logging.getLogger("harvest").info(f"Job {job.id}: {len(dois)} DOIs queued")
+        return job
+
+    def cancel(self, job: Job):
+        if job.status in (DONE, CANCELLED):
+            return
+        job.pending.clear()
+        if job in self._rr:
+            self._rr.remove(job)
+        job.status = CANCELLED
+        if not job.active:
+            self._finish(job)
+
+    def _forget_old_jobs(self):
+        finished = [j for j in self.jobs.values() if j.finished is not None]
+        for job in finished[: max(0, len(finished) - self.cfg.service.keep_jobs)]:
+            del self.jobs[job.id]
+
+    def _finish(self, job: Job):
+        if job.status != CANCELLED:
+            job.status = DONE
+        job.finished = time.time()
+        if job.rows:
+            job_dir = self.out_dir / "jobs" / job.id
+            job_dir.mkdir(parents=True, exist_ok=True)
+            _write_report(job.rows, job_dir, "report")
+            job.report = str(job_dir / "report.xlsx")
+        job.done_event.set()
+        logging.getLogger("harvest").info(
+            f"Job {job.id} {job.status}: {len(job.rows)}/{job.total} DOIs"
+        )
+
+    # ---------------- workers ----------------
+
+    async def _next(self) -> Tuple[Job, str]:
+        # one DOI per active job in turn
+        async with self._cond:
+            await self._cond.wait_for(lambda: bool(self._rr))
+            job = self._rr[0]
+            self._rr.rotate(-1)
+            doi = job.pending.popleft()
+            if not job.pending:
+                self._rr.remove(job)
+            job.status = RUNNING
+            job.active += 1
+            return job, doi
+
+    async def _worker(self):
+        log = logging.getLogger("harvest")
+        while True:
+            job, doi = await self._next()
+            try:
+                row = await self._harvest(doi, job.cfg, job.ocr)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"Job {job.id}: {doi} failed: {e}")
+                row = {"doi": doi, "error": str(e)}
+            job.rows.append(row)
+            job.active -= 1
+            if not job.pending and not job.active:
+                self._finish(job)
+
+    async def _harvest(
+        self, doi: str, cfg: Config, ocr: Optional[OcrLane] = None
+    ) -> Dict[str, Any]:
+        # jobs asking for the same DOI and needles share one run (see _harvest_one)
+        return await _harvest_one(
+            doi, cfg, self.api_client, self.pdf_client, self.out_dir,
+            self.scheduler, ocr, self.splitter,
+        )
+
+    # ---------------- HTTP API ----------------
+
+    async def dispatch(
+        self, method: str, target: str, body: bytes
+    ) -> Tuple[int, Any]:
+        """
+        POST /jobs {"dois": [...], "strings": [...]}  → 202 job summary
+        GET /jobs                                     → job summaries
+        GET /jobs/<id>[?wait=<seconds>]               → job summary, once done or
+                                                        after `wait` seconds
+        GET /jobs/<id>/rows                           → report rows so far
+        DELETE /jobs/<id>                             → cancel queued DOIs
+        """
+        url = urllib.parse.urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = urllib.parse.parse_qs(url.query)
+        if not parts or parts[0] != "jobs":
+            return 404, {"error": "not found"}
+        if len(parts) == 1:
+            if method == "GET":
+                return 200, [j.summary() for j in self.jobs.values()]
+            if method == "POST":
+                try:
+                    req = json.loads(body or b"{}")
+                    dois = req["dois"]
+                    strings = req.get("strings")
+                    if not isinstance(dois, list) or not (
+                        strings is None or isinstance(strings, list)
+                    ):
+                        raise ValueError("`dois` and `strings` must be lists")
+                except (ValueError, KeyError, TypeError) as e:
+                    return 400, {"error": f"bad job: {e}"}
+                return 202, (await self.submit(dois, strings)).summary()
+            return 400, {"error": f"unsupported method {method}"}
+        job = self.jobs.get(parts[1])
+        if job is None:
+            return 404, {"error": f"no job {parts[1]}"}
+        if len(parts) == 3 and parts[2] == "rows" and method == "GET":
+            return 200, job.rows
+        if len(parts) == 2 and method == "GET":
+            if "wait" in query:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        job.done_event.wait(), float(query["wait"][0] or 0)
+                    )
+            return 200, job.summary()
+        if len(parts) == 2 and method == "DELETE":
+            self.cancel(job)
+            return 200, job.summary()
+        return 400, {"error": f"unsupported request {method} {url.path}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                line = (await reader.readline()).decode("latin-1")
+                method, target, _ = line.split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                status, payload = await self.dispatch(method.upper(), target, body)
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                status, payload = 400, {"error": f"bad request: {e}"}
+            data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            writer.write(
+                (
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode("latin-1")
+                + data
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def listen(self) -> asyncio.AbstractServer:
+        svc = self.cfg.service
+        if svc.unix_socket:
+            path = pathlib.Path(svc.unix_socket)
+            path.unlink(missing_ok=True)
+            return await asyncio.start_unix_server(self._handle, path=str(path))
+        return await asyncio.start_server(self._handle, svc.host, svc.port)
+
+
+async def serve(config: Config):
+    """Run the job server until cancelled (Ctrl+C)."""
+    log = setup_logging(config, _output_dir(config))
+    svc = config.service
+    async with HarvestService(config) as service:
+        server = await service.listen()
+        where = svc.unix_socket or f"http://{svc.host}:{svc.port}"
+        log.info(f"Harvest service listening on {where}")
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,248 @@
+# snapshot.py
+from __future__ import annotations
+
+import glob
+import gzip
+import json
+import logging
+import pathlib
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cache import normalize_doi, project
+from .config import Config
+
+# ruff formatting
+SOURCES = ("crossref", "unpaywall")
+DAY = 86400.0
+_NAME_DATE = re.compile(r"(?<!\d)(\d{4})-?(\d{2})-?(\d{2})(?!\d)")
+
+
+def iter_snapshot(path: pathlib.Path) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a (gzipped) JSONL dump, one line at a time.
+    A line may hold one record or a Crossref-style {"items": [...]} page.
+    """
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(obj, dict) and isinstance(obj.get("items"), list):
+                yield from obj["items"]
+            elif isinstance(obj, dict):
+                yield obj
+
+
+class SnapshotIndex:
+    """
+    On-disk DOI → record index (SQLite) built from an Unpaywall/Crossref dump.
+    Records are stored as compact JSON next to the time of the dump they came from.
+    Raw records (older indexes, cache.keep_raw) are projected when looked up.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS records "
+            "(doi TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL)"
+        )
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def build(
+        self,
+        records: Iterable[Dict[str, Any]],
+        updated: Optional[float] = None,
+        batch: int = 10_000,
+        ns: str = "",
+    ) -> int:
+        """
+        Insert/replace `records` (taken at time `updated`), committing every `batch`
+        rows so memory stays bounded regardless of the dump size. With `ns`
+        ("crossref" / "unpaywall") only the projected fields are stored.
+        Returns the number of records indexed.
+        """
+        log = logging.getLogger("harvest")
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        sql = "INSERT OR REPLACE INTO records (doi, data, updated) VALUES (?, ?, ?)"
+        rows, n = [], 0
+        for rec in records:
+            doi = rec.get("doi") or rec.get("DOI")
+            if not doi:
+                continue
+            rows.append(
+                (
+                    normalize_doi(doi),
+                    json.dumps(
+                        project(ns, rec) if ns else rec,
+                        ensure_ascii=False,
+                        separators=(",", ":"),
+                    ),
+                    updated,
+                )
+            )
+            if len(rows) >= batch:
+                self._db.executemany(sql, rows)
+                self._db.commit()
+                n += len(rows)
+                rows.clear()
+                log.info(f"Snapshot index {self.path.name}: {n} records")
+        if rows:
+            self._db.executemany(sql, rows)
+            n += len(rows)
+        self._db.commit()
+        return n
+
+    def stamp(self, updated: float):
+        """Date the records indexed without one (build(updated=None))."""
+        self._db.execute("UPDATE records SET updated = ? WHERE updated IS NULL", (updated,))
+        self._db.commit()
+
+    def get(
+        self, doi: str, max_age: Optional[float] = None, now: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record for `doi`, or None if missing or older than `max_age` seconds.
+        """
+        row = self._db.execute(
+            "SELECT data, updated FROM records WHERE doi = ?", (normalize_doi(doi),)
+        ).fetchone()
+        if row is None:
+            return None
+        data, updated = row
+        if max_age and updated is not None and (now or time.time()) - updated > max_age:
+            return None
+        return json.loads(data)
+
+
+def index_path(base: pathlib.Path, cfg: Config, ns: str) -> pathlib.Path:
+    return base / cfg.snapshots.index_dir / f"{ns}.sqlite"
+
+
+_OPEN: Dict[pathlib.Path, SnapshotIndex] = {}
+
+
+def open_index(path: pathlib.Path) -> Optional[SnapshotIndex]:
+    """Shared, lazily opened index (None if it has not been built)."""
+    if path not in _OPEN and path.exists():
+        _OPEN[path] = SnapshotIndex(path)
+    return _OPEN.get(path)
+
+
+def snapshot_for(
+    base: pathlib.Path, cfg: Config, ns: str
+) -> Tuple[Optional[SnapshotIndex], Optional[float]]:
+    """(index, max_age in seconds) for source `ns`, or (None, None) when not configured."""
+    if not getattr(cfg.snapshots, ns):
+        return None, None
+    days = cfg.snapshots.max_age_days
+    return open_index(index_path(base, cfg, ns)), (float(days) * DAY if days else None)
+
+
+def _parse_date(value: Any) -> Optional[float]:
+    # ISO date / date-time (naive = UTC) → epoch seconds
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        when = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def record_date(rec: Dict[str, Any]) -> Optional[float]:
+    """Last update of a dump record: Unpaywall `updated`, Crossref `indexed`."""
+    indexed = rec.get("indexed")
+    if isinstance(indexed, dict):
+        return _parse_date(indexed.get("date-time"))
+    return _parse_date(rec.get("updated"))
+
+
+def dump_date(cfg: Config, ns: str, path: pathlib.Path) -> Optional[float]:
+    """
+    Date of the dump at `path`: snapshots.<ns>_date, else a YYYY-MM-DD /
+    YYYYMMDD date in the file name, else None (see build_indexes).
+    """
+    configured = getattr(cfg.snapshots, f"{ns}_date")
+    if configured:
+        when = _parse_date(str(configured))
+        if when is None:
+            raise ValueError(f"Invalid snapshots.{ns}_date: {configured!r}")
+        return when
+    for m in _NAME_DATE.finditer(path.name):
+        when = _parse_date("-".join(m.groups()))
+        if when is not None:
+            return when
+    return None
+
+
+def _track_newest(
+    records: Iterable[Dict[str, Any]], newest: List[float]
+) -> Iterator[Dict[str, Any]]:
+    for rec in records:
+        when = record_date(rec)
+        if when is not None and (not newest or when > newest[0]):
+            newest[:] = [when]
+        yield rec
+
+
+def build_indexes(base: pathlib.Path, cfg: Config) -> Dict[str, int]:
+    """Build the index of every configured snapshot source; returns record counts."""
+    log = logging.getLogger("harvest")
+    counts = {}
+    for ns in SOURCES:
+        src = getattr(cfg.snapshots, ns)
+        if not src:
+            continue
+        files = [pathlib.Path(f) for f in sorted(glob.glob(src))]
+        if not files:
+            log.warning(f"No {ns} snapshot files match {src}")
+            continue
+        path = index_path(base, cfg, ns)
+        if path in _OPEN:
+            _OPEN.pop(path).close()
+        idx = SnapshotIndex(path)
+        counts[ns] = 0
+        for f in files:
+            log.info(f"Indexing {ns} snapshot {f}")
+            # the file's mtime changes on copy/touch, so it is only the last resort
+            when, newest = dump_date(cfg, ns, f), []
+            records = iter_snapshot(f)
+            if when is None:
+                records = _track_newest(records, newest)
+            counts[ns] += idx.build(
+                records,
+                updated=when,
+                ns="" if cfg.cache.keep_raw else ns,
+            )
+            if when is None:
+                if newest:
+                    when = newest[0]
+                else:
+                    when = f.stat().st_mtime
+                    log.warning(
+                        f"No date for {ns} snapshot {f}: using its modification time; "
+                        f"set snapshots.{ns}_date"
+                    )
+                idx.stamp(when)
+        idx.close()
+        log.info(f"Snapshot index {path}: {counts[ns]} records")
+    return counts
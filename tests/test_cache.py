@@ -0,0 +1,106 @@
+# tests/test_cache.py
+import json
+from pathlib import Path
+
+import PDF_Finder as pf
+from PDF_Finder.cache import (
+    HOUR,
+    NOT_FOUND,
+    TRANSIENT,
+    cache_path,
+    entry_name,
+    negative_cache_from_cfg,
+    shard,
+    write_cache_json,
+)
+
+
+# ruff formatting
+def test_negative_cache_schedule(tmp_path: Path):
+    neg = pf.NegativeCache(tmp_path, {TRANSIENT: [1, 6]})
+    now = 1_000_000.0
+
+    e = neg.record("10.1/x", "pdf", TRANSIENT, now=now)
+    assert e["attempts"] == 1 and e["retry_at"] == now + 1 * HOUR
+    assert neg.blocked("10.1/x", "pdf", now=now + 10) == TRANSIENT
+    assert neg.due("10.1/x", "pdf", now=now + 2 * HOUR)
+
+    e = neg.record("10.1/x", "pdf", TRANSIENT, now=now)
+    assert e["attempts"] == 2 and e["retry_at"] == now + 6 * HOUR
+    # schedule repeats its last step
+    e = neg.record("10.1/x", "pdf", TRANSIENT, now=now)
+    assert e["retry_at"] == now + 6 * HOUR
+
+    # a different class restarts the ladder
+    e = neg.record("10.1/x", "pdf", NOT_FOUND, now=now)
+    assert e["attempts"] == 1
+
+
+def test_negative_cache_stages_and_clear(tmp_path: Path):
+    neg = pf.NegativeCache(tmp_path)
+    neg.record("10.1/x", "crossref", NOT_FOUND)
+    neg.record("10.1/x", "pdf", TRANSIENT)
+    assert neg.blocked("10.1/x", "unpaywall") is None
+
+    neg.clear("10.1/x", "crossref")
+    assert neg.get("10.1/x", "crossref") is None
+    assert neg.get("10.1/x", "pdf")["kind"] == TRANSIENT
+    neg.clear("10.1/x", "pdf")
+    assert not (tmp_path / "cache" / "negative" / "10.1_x.json").exists()
+
+
+def test_negative_cache_follows_cache_switch(tmp_path: Path):
+    def cfg(raw):
+        return pf.Config.from_dict(raw)
+
+    assert negative_cache_from_cfg(tmp_path, cfg({"cache": {"enabled": False}})) is None
+    assert negative_cache_from_cfg(tmp_path, cfg({"negative_cache": {"enabled": False}})) is None
+    neg = negative_cache_from_cfg(tmp_path, cfg({"negative_cache": {"no_oa": [2]}}))
+    assert neg.schedule["no_oa"] == [2]
+
+
+def test_sharded_names_are_distinct_and_stable(tmp_path: Path):
+    a, b = "10.1000/abc", "10.1000:abc"
+    assert pf.sanitize_filename(a) == pf.sanitize_filename(b)
+    assert entry_name(a) != entry_name(b)
+    assert entry_name("DOI:10.1000/ABC") == entry_name(a)  # DOIs are case-insensitive
+
+    p = cache_path(tmp_path, "crossref", a, sharded=True)
+    assert p.parent.parent.parent == tmp_path / "cache" / "crossref"
+    assert p.parent.name == shard(a)[3:]
+    write_cache_json(p, {"DOI": a})  # creates the shard directory
+    assert p.exists()
+
+
+def test_projected_metadata_keeps_report_fields():
+    from PDF_Finder.cache import is_projected, project
+    from PDF_Finder.orchestrator import flatten_meta
+
+    raw = {
+        "DOI": "10.1/x",
+        "title": ["A title"],
+        "container-title": ["Journal"],
+        "issued": {"date-parts": [[2021, 3]]},
+        "author": [{"given": "Ada", "family": "Lovelace", "affiliation": ["AGH"]}],
+        "publisher": "Pub",
+        "type": "journal-article",
+        "URL": "https://doi.org/10.1/x",
+        "reference": [{"key": str(i), "unstructured": "x" * 200} for i in range(500)],
+    }
+    meta = project("crossref", raw)
+    assert is_projected(meta) and "reference" not in meta
+    assert flatten_meta(meta) == flatten_meta(raw)
+    assert project("crossref", meta) is meta
+    assert len(json.dumps(meta)) < len(json.dumps(raw)) / 50
+
+    ua = {
+        "doi": "10.1/x",
+        "is_oa": True,
+        "best_oa_location": {"url": "https://h/x", "url_for_pdf": None, "license": "cc-by"},
+        "oa_locations": [{"url_for_pdf": "https://h/x.pdf", "evidence": "..."}, {}],
+        "z_authors": [{"given": "Ada"}],
+    }
+    oa = project("unpaywall", ua)
+    assert pf.best_pdf_url(oa) == pf.best_pdf_url(ua)
+    assert oa["best_oa_location"]["license"] == "cc-by"
+    assert len(oa["oa_locations"]) == 1 and "z_authors" not in oa
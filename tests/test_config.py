@@ -21,7 +21,7 @@ def test_config_defaults():
     assert cfg.cache.enabled is True
     assert cfg.cache.force_refresh is False
 
-    assert cfg.http.user_agent == "pdfharvest/1.0"
+    assert cfg.http.user_agent == ""
     assert cfg.http.max_keepalive == 20
     assert cfg.http.max_connections == 20
 
@@ -89,3 +89,39 @@ def test_config_from_yaml(tmp_path: Path):
     assert cfg.logging.file == "some_file"
     assert cfg.logging.rotate_bytes == 29
     assert cfg.logging.backup_count == 11
+
+
+def test_default_user_agent_carries_email():
+    from PDF_Finder.orchestrator import _client_kwargs
+
+    ua = _client_kwargs(pf.Config(email="me@example.org"))["headers"]["User-Agent"]
+    assert ua == "doi-harvest/2.0 (+me@example.org)"
+    cfg = pf.Config.from_dict({"email": "me@example.org", "http": {"max_keepalive": 5}})
+    assert "me@example.org" in _client_kwargs(cfg)["headers"]["User-Agent"]
+    cfg = pf.Config.from_dict({"http": {"user_agent": "custom/1.0"}})
+    assert _client_kwargs(cfg)["headers"]["User-Agent"] == "custom/1.0"
+
+
+def test_from_dict_ignores_unknown_keys_and_casts(caplog):
+    cfg = pf.Config.from_dict(
+        {
+            "batch_size": "7",
+            "extra_top": 1,
+            "http": {"proxy": "http://proxy:3128", "max_connections": "12"},
+            "timeouts": {"read": 45, "connect": "5"},
+            "negative_cache": {"no_oa": [1, "2.5"]},
+            "cache": {"enabled": "false"},
+            "ocr": None,
+            "snapshots": {"max_age_days": 0.5},
+        }
+    )
+    assert cfg.snapshots.max_age_days == 0.5  # cast by annotation, not truncated to 0
+    snap = pf.Config.from_dict({"snapshots": {"max_age_days": "7.5"}}).snapshots
+    assert snap.max_age_days == 7.5
+    assert cfg.batch_size == 7
+    assert cfg.http.max_connections == 12
+    assert isinstance(cfg.timeouts.read, float) and cfg.timeouts.connect == 5.0
+    assert cfg.negative_cache.no_oa == [1.0, 2.5]
+    assert cfg.cache.enabled is False
+    assert cfg.ocr.enabled is False
+    assert "proxy" in caplog.text and "extra_top" in caplog.text
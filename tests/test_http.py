@@ -117,3 +117,35 @@ def test_best_pdf_url_fallback_locations():
 
 def test_best_pdf_url_no_url():
     assert pf.best_pdf_url({}) is None
+
+
+@pytest.mark.asyncio
+async def test_backoff_request_does_not_retry_404():
+    calls = {"count": 0}
+
+    async def handler(request):
+        calls["count"] += 1
+        return httpx.Response(404)
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await pf.backoff_request(client, "GET", "https://example.com")
+    assert calls["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_download_pdf_status_classifies_failures(tmp_path):
+    async def handler(request):
+        if request.url.path == "/gone.pdf":
+            return httpx.Response(404)
+        if request.url.path == "/paywall.pdf":
+            return httpx.Response(403)
+        return httpx.Response(200, content=b"<html>login</html>")
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        out = tmp_path / "x.pdf"
+        assert await pf.download_pdf_status(client, "https://h/gone.pdf", out) == "not_found"
+        assert await pf.download_pdf_status(client, "https://h/paywall.pdf", out) == "not_pdf"
+        assert await pf.download_pdf_status(client, "https://h/landing", out) == "not_pdf"
@@ -0,0 +1,66 @@
+# tests/test_layout.py
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pandas as pd
+
+import PDF_Finder as pf
+from PDF_Finder.cache import cache_path, pdf_path
+
+
+# ruff formatting
+def test_manifest_roundtrip(tmp_path: Path):
+    m = pf.Manifest(tmp_path / "manifest.jsonl")
+    m.add("10.1/abc")
+    m.add("10.1/abc")
+    assert len(m) == 1
+
+    name = pdf_path(tmp_path, "10.1/abc", sharded=True)
+    reopened = pf.Manifest(tmp_path / "manifest.jsonl")
+    assert reopened.doi_for(name) == "10.1/abc"
+    assert reopened.doi_for("unknown-0000000000000000.pdf") is None
+
+
+def test_migrate_flat_tree(tmp_path: Path):
+    cfg = pf.Config.from_dict({"folders": {"downloads": "dl", "found": "found", "notfound": "nf"}})
+    for d in ("dl", "found", "nf", "cache/crossref", "cache/matches"):
+        (tmp_path / d).mkdir(parents=True)
+    pd.DataFrame({"doi": ["10.1/a", "10.1/b", "10.2/x", "10.2:x"]}).to_csv(
+        tmp_path / "report.csv", index=False
+    )
+    (tmp_path / "found" / "10.1_a.pdf").write_bytes(b"%PDF a")
+    (tmp_path / "nf" / "10.1_b.pdf").write_bytes(b"%PDF b")
+    (tmp_path / "nf" / "10.2_x.pdf").write_bytes(b"%PDF ambiguous")
+    (tmp_path / "cache" / "crossref" / "10.1_a.json").write_text(
+        json.dumps({"DOI": "10.1/a"})
+    )
+    (tmp_path / "cache" / "matches" / "10.1_b.json").write_text("{}")
+
+    stats = pf.migrate_to_sharded(tmp_path, cfg)
+
+    assert stats == {"moved": 4, "unresolved": 1, "duplicates": 0}
+    assert pdf_path(tmp_path / "found", "10.1/a", True).read_bytes() == b"%PDF a"
+    assert pdf_path(tmp_path / "nf", "10.1/b", True).exists()
+    assert cache_path(tmp_path, "crossref", "10.1/a", True).exists()
+    assert cache_path(tmp_path, "matches", "10.1/b", True).exists()
+    assert (tmp_path / "nf" / "10.2_x.pdf").exists()  # two DOIs share that name
+    assert pf.Manifest(tmp_path / "manifest.jsonl").doi_for(
+        pdf_path(tmp_path, "10.1/b", True)
+    ) == "10.1/b"
+
+
+def test_prefetch_records_sharded_dois_in_manifest(tmp_path: Path):
+    from PDF_Finder.orchestrator import prefetch_one
+
+    cfg = pf.Config.from_dict({"email": "test@example.com", "folders": {"sharded": True}})
+
+    async def go():
+        handler = lambda request: httpx.Response(404)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await prefetch_one("10.1/pre", cfg, client, tmp_path)
+
+    asyncio.run(go())
+    manifest = pf.Manifest(tmp_path / "manifest.jsonl")
+    assert manifest.doi_for(cache_path(tmp_path, "crossref", "10.1/pre", True)) == "10.1/pre"
@@ -0,0 +1,123 @@
+# tests/test_ocr.py
+import asyncio
+from pathlib import Path
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from PIL import Image
+
+import PDF_Finder as pf
+from PDF_Finder.orchestrator import process_batch_pdfs
+
+
+# ruff formatting
+def fake_engine(image: bytes) -> str:
+    return "scanned for the IDUB programme"
+
+
+def _scanned_pdf(path: Path):
+    c = canvas.Canvas(str(path))
+    c.drawImage(ImageReader(Image.new("RGB", (40, 40), "white")), 10, 10)
+    c.showPage()
+    c.save()
+
+
+def test_scan_pdf_reports_textless_pages(tmp_path: Path):
+    pdf = tmp_path / "scan.pdf"
+    _scanned_pdf(pdf)
+    res, textless = pf.scan_pdf(pdf, ["IDUB"])
+    assert res["found"] is False
+    assert textless == [1]
+
+
+def test_ocr_lane_budget(tmp_path: Path):
+    pdf = tmp_path / "scan.pdf"
+    _scanned_pdf(pdf)
+
+    async def go():
+        lane = pf.OcrLane(engine=fake_engine, workers=1, max_pages=1)
+        try:
+            out = await lane.submit(pdf, [1])
+            assert lane.submit(pdf, [1]) is None  # page budget spent
+            return out
+        finally:
+            lane.close()
+
+    out = asyncio.run(go())
+    assert "IDUB" in out["texts"][1]
+
+
+def test_ocr_lane_reserves_cpu_at_submit(tmp_path: Path):
+    pdf = tmp_path / "scan.pdf"
+    _scanned_pdf(pdf)
+
+    async def go():
+        lane = pf.OcrLane(engine=fake_engine, workers=1, max_cpu_seconds=5, cpu_per_page=3)
+        try:
+            first = lane.submit(pdf, [1])
+            assert first is not None
+            assert lane.submit(pdf, [1]) is None  # 2 × 3 s would exceed the 5 s budget
+            await first
+            assert lane.cpu_reserved == 0
+        finally:
+            lane.close()
+
+    asyncio.run(go())
+
+
+def test_process_batch_merges_ocr_hits(tmp_path: Path):
+    staged = tmp_path / "downloads" / "10.1_scan.pdf"
+    staged.parent.mkdir()
+    _scanned_pdf(staged)
+    cfg = pf.Config.from_dict({
+        "strings": ["IDUB"],
+        "cache": {"enabled": True},
+        "folders": {"found": "found", "notfound": "notfound"},
+    })
+    for ns in ("matches", "ocr"):
+        (tmp_path / "cache" / ns).mkdir(parents=True)
+    rows = [{"doi": "10.1/scan", "pdf_temp_path": str(staged)}]
+
+    async def go():
+        lane = pf.OcrLane(engine=fake_engine, workers=1)
+        try:
+            await process_batch_pdfs(rows, cfg, tmp_path, lane)
+        finally:
+            lane.close()
+
+    asyncio.run(go())
+    assert rows[0]["match_found"] is True
+    assert rows[0]["match_pages"] == "1"
+    assert (tmp_path / "found" / "10.1_scan.pdf").exists()
+    assert (tmp_path / "cache" / "ocr" / "10.1_scan.json").exists()
+
+
+def test_process_batch_leaves_ocr_to_background_tasks(tmp_path: Path):
+    (tmp_path / "downloads").mkdir()
+    scanned = tmp_path / "downloads" / "10.1_scan.pdf"
+    _scanned_pdf(scanned)
+    text = tmp_path / "downloads" / "10.1_text.pdf"
+    c = canvas.Canvas(str(text))
+    c.drawString(72, 720, "IDUB")
+    c.save()
+    cfg = pf.Config.from_dict({"strings": ["IDUB"], "cache": {"enabled": False}})
+    rows = [
+        {"doi": "10.1/scan", "pdf_temp_path": str(scanned)},
+        {"doi": "10.1/text", "pdf_temp_path": str(text)},
+    ]
+
+    async def go():
+        lane = pf.OcrLane(engine=fake_engine, workers=1)
+        tasks = []
+        try:
+            await process_batch_pdfs(rows, cfg, tmp_path, lane, ocr_tasks=tasks)
+            assert len(tasks) == 1 and not tasks[0].done()
+            assert rows[0]["pdf_temp_path"]  # still OCR'ing, not routed yet
+            assert rows[1]["pdf_final_path"]  # text hit routed without waiting
+            await asyncio.gather(*tasks)
+        finally:
+            lane.close()
+
+    asyncio.run(go())
+    assert rows[0]["match_found"] is True
+    assert not scanned.exists() and Path(rows[0]["pdf_final_path"]).exists()
@@ -1,6 +1,9 @@
 import asyncio
 import pandas as pd
 from pathlib import Path
+import PDF_Finder as pf
+from PDF_Finder import Config
+from PDF_Finder.config import CacheConfig
 from PDF_Finder.orchestrator import run
 
 def test_run_creates_output(tmp_path: Path):
@@ -40,3 +43,355 @@ strings: ["example", "test"]
 
     for sub in ["downloads", "found", "notfound", "cache"]:
         assert (out_dir / sub).exists(), f"Le dossier {sub} doit exister"
+
+
+def test_prepare_one_skips_recorded_dead_doi(tmp_path: Path):
+    import httpx
+    from PDF_Finder.orchestrator import prepare_one
+
+    calls = {"count": 0}
+
+    async def handler(request):
+        calls["count"] += 1
+        return httpx.Response(404)
+
+    cfg = Config.from_dict({
+        "email": "test@example.com",
+        "folders": {"downloads": "downloads"},
+        "cache": {"enabled": True},
+    })
+
+    async def go():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await prepare_one("10.1/dead", cfg, client, client, tmp_path)
+
+    row = asyncio.run(go())
+    assert row["pdf_url"] == ""
+    assert calls["count"] == 2  # one Crossref + one Unpaywall try, no retry ladder
+
+    asyncio.run(go())
+    assert calls["count"] == 2  # both lookups skipped via the negative cache
+
+
+def test_prefetch_one_warms_caches(tmp_path: Path):
+    import httpx
+    from PDF_Finder.orchestrator import prefetch_one
+
+    calls = {"count": 0}
+
+    async def handler(request):
+        calls["count"] += 1
+        if request.url.host == "api.crossref.org":
+            return httpx.Response(
+                200, json={"message": {"title": ["A paper"], "publisher": "AGH"}}
+            )
+        return httpx.Response(
+            200,
+            json={
+                "is_oa": True,
+                "best_oa_location": {"url_for_pdf": "https://arxiv.org/pdf/1.pdf"},
+            },
+        )
+
+    cfg = Config.from_dict({"email": "test@example.com", "cache": {"enabled": True}})
+    for ns in ("crossref", "unpaywall"):
+        (tmp_path / "cache" / ns).mkdir(parents=True)
+
+    async def go():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await prefetch_one("10.1/ok", cfg, client, tmp_path)
+
+    row = asyncio.run(go())
+    assert row["title"] == "A paper"
+    assert row["is_oa"] is True
+    assert row["pdf_host"] == "arxiv.org"
+    assert (tmp_path / "cache" / "crossref" / "10.1_ok.json").exists()
+
+    asyncio.run(go())
+    assert calls["count"] == 2  # second pass served from the warm caches
+
+
+def test_prepare_one_downloads_without_waiting_for_crossref(tmp_path: Path):
+    import httpx
+    from PDF_Finder.orchestrator import prepare_one
+
+    events = []
+
+    async def handler(request):
+        events.append(request.url.host)
+        if request.url.host == "api.crossref.org":
+            await asyncio.sleep(0.2)
+            events.append("crossref done")
+            return httpx.Response(200, json={"message": {"title": ["Slow"]}})
+        if request.url.host == "api.unpaywall.org":
+            return httpx.Response(
+                200, json={"is_oa": True, "best_oa_location": {"url": "https://h/x.pdf"}}
+            )
+        return httpx.Response(200, content=b"%PDF-1.4 tiny")
+
+    cfg = Config.from_dict({
+        "email": "test@example.com",
+        "folders": {"downloads": "downloads"},
+        "cache": {"enabled": False},
+    })
+
+    async def go():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await prepare_one("10.1/x", cfg, client, client, tmp_path)
+
+    row = asyncio.run(go())
+    assert row["title"] == "Slow"
+    assert Path(row["pdf_temp_path"]).read_bytes().startswith(b"%PDF")
+    assert events.index("h") < events.index("crossref done")
+
+
+def test_prepare_one_branch_timeout(tmp_path: Path):
+    import httpx
+    from PDF_Finder.orchestrator import prepare_one
+
+    async def handler(request):
+        if request.url.host == "api.crossref.org":
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"message": {}})
+
+    cfg = Config.from_dict({
+        "email": "test@example.com",
+        "folders": {"downloads": "downloads"},
+        "cache": {"enabled": True},
+        "timeouts": {"metadata": 0.1},
+    })
+
+    async def go():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await prepare_one("10.1/slow", cfg, client, client, tmp_path)
+
+    row = asyncio.run(asyncio.wait_for(go(), 2))
+    assert row["title"] == ""
+    neg = (tmp_path / "cache" / "negative" / "10.1_slow.json").read_text()
+    assert "transient" in neg
+
+
+def test_harvest_streams_rows_with_caller_clients(tmp_path: Path):
+    import httpx
+    from PDF_Finder.orchestrator import harvest
+
+    async def handler(request):
+        if request.url.host == "api.unpaywall.org" and "slow" in request.url.path:
+            await asyncio.sleep(0.3)
+        return httpx.Response(404)
+
+    cfg = Config(email="test@example.com", output_dir=str(tmp_path), concurrency=2)
+    pulled = []
+
+    async def source():
+        for doi in ("10.1/slow", "10.1/a", "10.1/b"):
+            pulled.append(doi)
+            yield doi
+
+    async def go():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            rows = [r async for r in harvest(source(), cfg, client, client)]
+            assert not client.is_closed  # caller-owned clients stay open
+            return rows
+
+    rows = asyncio.run(go())
+    # completion order: the slow DOI does not hold back the others
+    assert {r["doi"] for r in rows[:2]} == {"10.1/a", "10.1/b"}
+    assert rows[-1]["doi"] == "10.1/slow"
+    assert pulled == ["10.1/slow", "10.1/a", "10.1/b"]
+
+
+def test_harvest_aclose_cancels_in_flight(tmp_path: Path):
+    import httpx
+    from PDF_Finder.orchestrator import harvest
+
+    started, cancelled = [], []
+
+    async def handler(request):
+        if "hang" in request.url.path:
+            started.append(request.url.path)
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.append(request.url.path)
+                raise
+        return httpx.Response(404)
+
+    cfg = Config(email="test@example.com", output_dir=str(tmp_path), concurrency=3)
+
+    async def go():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            stream = harvest(["10.1/ok", "10.1/hang1", "10.1/hang2"], cfg, client, client)
+            first = await stream.__anext__()
+            await stream.aclose()
+            return first
+
+    first = asyncio.run(asyncio.wait_for(go(), 5))
+    assert first["doi"] == "10.1/ok"
+    assert started and len(cancelled) == len(started)
+
+
+def test_prepare_one_coalesces_duplicate_work(tmp_path: Path):
+    import httpx
+    from PDF_Finder.orchestrator import prepare_one
+
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        await asyncio.sleep(0.05)
+        if request.url.host == "api.unpaywall.org":
+            return httpx.Response(
+                200,
+                json={"is_oa": True, "best_oa_location": {"url_for_pdf": "https://h/v.pdf"}},
+            )
+        if request.url.host == "h":
+            return httpx.Response(200, content=b"%PDF-1.4 volume")
+        return httpx.Response(200, json={"message": {"title": ["T"]}})
+
+    cfg = Config(email="test@example.com", cache=CacheConfig(enabled=False))
+    dois = ["10.1/a", "10.1/a", "10.1/b"]  # a duplicate DOI, and b sharing a's PDF URL
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await asyncio.gather(
+                *(prepare_one(d, cfg, client, client, tmp_path) for d in dois)
+            )
+
+    rows = asyncio.run(go())
+    assert calls.count("h") == 1  # one download for both DOIs
+    assert calls.count("api.unpaywall.org") == 2  # 10.1/a looked up once
+    assert rows[0]["pdf_temp_path"] == rows[1]["pdf_temp_path"]
+    paths = {r["pdf_temp_path"] for r in rows}
+    assert len(paths) == 2
+    assert all(Path(p).read_bytes() == b"%PDF-1.4 volume" for p in paths)
+
+
+def test_request_errors_are_not_negative_cached(tmp_path: Path):
+    import httpx
+    from PDF_Finder.cache import NOT_FOUND, NegativeCache
+    from PDF_Finder.orchestrator import prefetch_one
+
+    async def handler(request):
+        if request.url.host == "api.unpaywall.org":
+            return httpx.Response(422, json={"error": "email required"})
+        return httpx.Response(404)
+
+    async def go():
+        cfg = Config(email="test@example.com", cache=CacheConfig(enabled=True))
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await prefetch_one("10.1/x", cfg, client, tmp_path)
+
+    asyncio.run(go())
+    neg = NegativeCache(tmp_path)
+    assert neg.blocked("10.1/x", "unpaywall") is None  # a config fix applies next run
+    assert neg.blocked("10.1/x", "crossref") == NOT_FOUND
+
+
+def test_metadata_cache_is_projected(tmp_path: Path):
+    import json
+
+    import httpx
+    from PDF_Finder.cache import cache_path, is_projected, read_cache_json
+    from PDF_Finder.orchestrator import prefetch_one
+
+    raw_xref = {"DOI": "10.1/old", "title": ["Old"], "reference": [{"key": "r"}] * 100}
+    old = cache_path(tmp_path, "crossref", "10.1/old")
+    old.parent.mkdir(parents=True)
+    old.write_text(json.dumps(raw_xref, indent=2))  # full payload, pre-projection format
+
+    async def handler(request):
+        if request.url.host == "api.unpaywall.org":
+            return httpx.Response(200, json={"doi": "10.1/new", "is_oa": False, "z": 1})
+        return httpx.Response(200, json={"message": {"title": ["New"], "reference": []}})
+
+    async def go(doi, keep_raw):
+        cfg = Config(email="test@example.com", cache=CacheConfig(keep_raw=keep_raw))
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await prefetch_one(doi, cfg, client, tmp_path)
+
+    row = asyncio.run(go("10.1/old", False))
+    assert row["title"] == "Old"
+    assert is_projected(read_cache_json(old))  # rewritten compactly on first read
+
+    row = asyncio.run(go("10.1/new", True))
+    assert row["title"] == "New"
+    new = read_cache_json(cache_path(tmp_path, "unpaywall", "10.1/new"))
+    assert is_projected(new) and "z" not in new
+    raw = read_cache_json(cache_path(tmp_path, "unpaywall_raw", "10.1/new"))
+    assert raw["z"] == 1
+
+
+def test_harvest_yields_error_row_and_keeps_streaming(tmp_path: Path, monkeypatch):
+    import httpx
+    from PDF_Finder import orchestrator
+
+    real = orchestrator._harvest_one
+
+    async def flaky(doi, *args):
+        if doi == "10.1/bad":
+            raise OSError("disk full")
+        return await real(doi, *args)
+
+    monkeypatch.setattr(orchestrator, "_harvest_one", flaky)
+
+    async def handler(request):
+        return httpx.Response(404)
+
+    cfg = Config(email="test@example.com", output_dir=str(tmp_path), concurrency=2)
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            stream = orchestrator.harvest(["10.1/bad", "10.1/ok"], cfg, client, client)
+            return [r async for r in stream]
+
+    rows = {r["doi"]: r for r in asyncio.run(go())}
+    assert rows["10.1/bad"]["error"] == "disk full"
+    assert "error" not in rows["10.1/ok"]
+
+
+def test_prepare_one_limit_bounds_lookups_not_downloads(tmp_path: Path):
+    import httpx
+    from PDF_Finder.orchestrator import prepare_one
+
+    active = {"api": 0, "pdf": 0}
+    peak = {"api": 0, "pdf": 0}
+
+    async def handler(request):
+        kind = "pdf" if request.url.host.endswith(".example") else "api"
+        active[kind] += 1
+        peak[kind] = max(peak[kind], active[kind])
+        await asyncio.sleep(0.05 if kind == "api" else 0.3)
+        active[kind] -= 1
+        if request.url.host == "api.unpaywall.org":
+            doi = request.url.path.split("/v2/")[-1]
+            url = f"https://h{doi[-1]}.example/x.pdf"
+            oa = {"is_oa": True, "best_oa_location": {"url_for_pdf": url}}
+            return httpx.Response(200, json=oa)
+        if kind == "pdf":
+            return httpx.Response(200, content=b"%PDF-1.4")
+        return httpx.Response(200, json={"message": {}})
+
+    cfg = Config(email="test@example.com", cache=CacheConfig(enabled=False))
+
+    async def go():
+        sem = asyncio.Semaphore(1)
+        sched = pf.HostScheduler(max_active=4)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await asyncio.gather(
+                *(
+                    prepare_one(f"10.1/{i}", cfg, client, client, tmp_path, sched, sem)
+                    for i in range(3)
+                )
+            )
+
+    rows = asyncio.run(go())
+    assert all(r["pdf_temp_path"] for r in rows)
+    assert peak["api"] <= 2  # one DOI's Crossref + Unpaywall at a time
+    assert peak["pdf"] >= 2  # downloads overlap once their lookups are done
@@ -49,3 +49,94 @@ def test_move_pdf_atomic_collision(tmp_path: Path):
     assert new_path.name == "file_1.pdf"
     assert new_path.exists()
     assert (dst_dir / "file.pdf").exists()
+
+
+def test_move_pdf_atomic_unique_replaces(tmp_path: Path):
+    dst_dir = tmp_path / "out" / "ab" / "cd"
+    src = tmp_path / "name-0123.pdf"
+    src.write_text("v1")
+    pdfops.move_pdf_atomic(src, dst_dir, unique=True)
+    src.write_text("v2")
+    new_path = pdfops.move_pdf_atomic(src, dst_dir, unique=True)
+
+    assert new_path == dst_dir / "name-0123.pdf"
+    assert new_path.read_text() == "v2"
+    assert len(list(dst_dir.iterdir())) == 1
+
+
+def test_page_splitter_matches_sequential_scan(tmp_path: Path):
+    from reportlab.pdfgen import canvas
+
+    pdf_path = tmp_path / "volume.pdf"
+    c = canvas.Canvas(str(pdf_path))
+    for i in range(1, 13):
+        if i % 5 == 0:
+            c.drawString(72, 720, f"Page {i}: supported by IDUB")
+        elif i != 7:  # page 7 stays empty (text-less)
+            c.drawString(72, 720, f"Page {i}")
+        c.showPage()
+    c.save()
+
+    splitter = pdfops.PageSplitter(workers=2, min_pages=10)
+    try:
+        res, textless = splitter.scan(pdf_path, ["idub", "nothing"])
+    finally:
+        splitter.close()
+    assert (res, textless) == pdfops.scan_pdf(pdf_path, ["idub", "nothing"])
+    assert res == {"found": True, "matches": ["idub"], "pages": [5, 10]}
+    assert textless == [7]
+
+
+def test_page_splitter_creates_one_pool_across_threads(tmp_path: Path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from reportlab.pdfgen import canvas
+
+    pdfs = []
+    for k in range(2):
+        pdf_path = tmp_path / f"v{k}.pdf"
+        c = canvas.Canvas(str(pdf_path))
+        for i in range(4):
+            c.drawString(72, 720, f"Page {i}")
+            c.showPage()
+        c.save()
+        pdfs.append(pdf_path)
+
+    created = []
+    real_pool = pdfops.worker_pool
+
+    def counting_pool(workers):
+        created.append(workers)
+        return real_pool(workers)
+
+    monkeypatch.setattr(pdfops, "worker_pool", counting_pool)
+    splitter = pdfops.PageSplitter(workers=2, min_pages=2)
+    try:
+        with ThreadPoolExecutor(2) as threads:
+            results = list(threads.map(lambda p: splitter.scan(p, ["page 3"]), pdfs))
+    finally:
+        splitter.close()
+    assert created == [2]
+    assert all(res["pages"] == [4] for res, _ in results)
+
+
+def test_page_splitter_parses_small_pdfs_once(tmp_path: Path, monkeypatch):
+    from reportlab.pdfgen import canvas
+
+    pdf_path = tmp_path / "paper.pdf"
+    c = canvas.Canvas(str(pdf_path))
+    c.drawString(72, 720, "supported by IDUB")
+    c.save()
+
+    opened = []
+    real_reader = pdfops.PdfReader
+
+    def counting_reader(path):
+        opened.append(path)
+        return real_reader(path)
+
+    monkeypatch.setattr(pdfops, "PdfReader", counting_reader)
+    splitter = pdfops.PageSplitter(workers=2, min_pages=10)
+    res, _ = splitter.scan(pdf_path, ["idub"])
+    assert res["pages"] == [1]
+    assert len(opened) == 1  # the reader that counted the pages also scanned them
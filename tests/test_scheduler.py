@@ -0,0 +1,108 @@
+# tests/test_scheduler.py
+import asyncio
+
+import pytest
+
+import PDF_Finder as pf
+from PDF_Finder.scheduler import RateLimiter, host_of
+
+
+# ruff formatting
+def test_host_of():
+    assert host_of("https://www.ncbi.nlm.nih.gov/pmc/x.pdf") == "www.ncbi.nlm.nih.gov"
+    assert host_of("HTTPS://ArXiv.org/pdf/1") == "arxiv.org"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_caps_per_host_and_interleaves():
+    """One busy host must not take the slots other hosts are waiting for."""
+    sched = pf.HostScheduler(max_active=3, per_host=2)
+    active, peak, order = {}, {}, []
+
+    async def job(url):
+        async with sched.slot(url) as host:
+            order.append(host)
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+
+    urls = [f"https://slow.example/{i}.pdf" for i in range(6)]
+    urls += ["https://fast.example/a.pdf", "https://fast.example/b.pdf"]
+    await asyncio.gather(*(job(u) for u in urls))
+
+    assert peak["slow.example"] == 2
+    # the fast host gets served within the first wave, not after all slow jobs
+    assert "fast.example" in order[:3]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_shrinks_slow_hosts():
+    sched = pf.HostScheduler(max_active=8, per_host=4, slow_after=1.0)
+    assert sched.host_limit("repo.example") == 4
+    await sched.acquire("repo.example")
+    sched.release("repo.example", elapsed=4.0)
+    assert sched.latency("repo.example") == 4.0
+    assert sched.host_limit("repo.example") == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancelled_waiter_frees_queue():
+    sched = pf.HostScheduler(max_active=1, per_host=1)
+    await sched.acquire("a.example")
+    waiter = asyncio.ensure_future(sched.acquire("a.example"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    sched.release("a.example")
+    await asyncio.wait_for(sched.acquire("b.example"), 1)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(50)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    for _ in range(5):
+        await limiter.wait()
+    assert loop.time() - t0 >= 4 / 50 * 0.9
+
+
+def test_normalize_url():
+    from PDF_Finder.scheduler import normalize_url
+
+    assert normalize_url("HTTPS://Repo.org:443/a.pdf#page=2") == "https://repo.org/a.pdf"
+    assert normalize_url("http://repo.org:8080/a.pdf?x=1") == "http://repo.org:8080/a.pdf?x=1"
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_and_cancels_when_abandoned():
+    from PDF_Finder.scheduler import SingleFlight
+
+    flights, runs = SingleFlight(), []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": len(runs)}
+
+    a, b = await asyncio.gather(flights.do("k", work), flights.do("k", work))
+    assert a is b and runs == [1]
+    assert len(flights) == 0  # forgotten once done
+
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(30)
+
+    waiters = [asyncio.ensure_future(flights.do("h", hang)) for _ in range(2)]
+    await started.wait()
+    waiters[0].cancel()
+    await asyncio.sleep(0)
+    assert len(flights) == 1  # still wanted by the second caller
+    waiters[1].cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert len(flights) == 0
@@ -0,0 +1,143 @@
+# tests/test_service.py
+import asyncio
+import io
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+import PDF_Finder as pf
+from PDF_Finder.config import FolderConfig, OcrConfig
+from PDF_Finder.orchestrator import _stage_pdf, process_batch_pdfs
+
+
+def _cfg(tmp_path: Path, **service) -> pf.Config:
+    return pf.Config.from_dict(
+        {
+            "email": "test@example.com",
+            "output_dir": str(tmp_path),
+            "cache": {"enabled": False},
+            "service": {"port": 0, **service},
+        }
+    )
+
+
+# ruff formatting
+def fake_engine(image: bytes) -> str:
+    return "scanned for the IDUB programme"
+
+
+@pytest.mark.asyncio
+async def test_service_runs_job_over_http(tmp_path: Path):
+    async def handler(request):
+        return httpx.Response(404)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as mock:
+        async with pf.HarvestService(_cfg(tmp_path), mock, mock) as service:
+            server = await service.listen()
+            port = server.sockets[0].getsockname()[1]
+            base = f"http://127.0.0.1:{port}"
+            async with server, httpx.AsyncClient(base_url=base) as c:
+                job = {"dois": ["10.1/a", "10.1/b"]}
+                r = await c.post("/jobs", content=json.dumps(job))
+                assert r.status_code == 202
+                job_id = r.json()["id"]
+
+                r = await c.get(f"/jobs/{job_id}", params={"wait": 5})
+                summary = r.json()
+                assert summary["status"] == "done"
+                assert summary["done"] == 2
+                assert Path(summary["report"]).exists()
+
+                rows = (await c.get(f"/jobs/{job_id}/rows")).json()
+                assert {r["doi"] for r in rows} == {"10.1/a", "10.1/b"}
+                assert (await c.get("/jobs/999")).status_code == 404
+                assert (await c.post("/jobs", content=b"{}")).status_code == 400
+        assert not mock.is_closed  # caller-owned client
+
+
+@pytest.mark.asyncio
+async def test_service_shares_inflight_and_interleaves_jobs(tmp_path: Path):
+    calls = []
+
+    async def handler(request):
+        if request.url.host == "api.unpaywall.org":
+            calls.append(request.url.path)
+            await asyncio.sleep(0.05)
+        return httpx.Response(404)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as mock:
+        cfg = _cfg(tmp_path, concurrency=2)
+        async with pf.HarvestService(cfg, mock, mock) as service:
+            a = await service.submit(["10.1/shared"])
+            b = await service.submit(["10.1/shared"])
+            await asyncio.wait_for(b.done_event.wait(), 5)
+            assert len(calls) == 1  # one lookup served both jobs
+            assert a.rows[0]["doi"] == b.rows[0]["doi"] == "10.1/shared"
+
+            big = await service.submit([f"10.2/{i}" for i in range(8)])
+            small = await service.submit(["10.3/x"])
+            await asyncio.wait_for(small.done_event.wait(), 5)
+            assert big.status == "running"  # the small job did not queue behind it
+
+
+def test_match_cache_is_keyed_by_needles(tmp_path: Path):
+    staged = tmp_path / "downloads" / "10.1_x.pdf"
+    staged.parent.mkdir()
+    c = canvas.Canvas(str(staged))
+    c.drawString(72, 720, "Funded by IDUB")
+    c.save()
+    (tmp_path / "cache" / "matches").mkdir(parents=True)
+
+    def scan(strings):
+        cfg = pf.Config(strings=strings, folders=FolderConfig(found="f", notfound="n"))
+        url = "https://x.org/x.pdf"
+        tmp = asyncio.run(_stage_pdf("10.1/x", url, cfg, None, tmp_path, None))
+        rows = [{"doi": "10.1/x", "pdf_temp_path": tmp}]
+        asyncio.run(process_batch_pdfs(rows, cfg, tmp_path))
+        return rows[0]
+
+    first = scan(["nothing"])
+    assert first["match_found"] is False
+    # staged again from notfound/, not downloaded (no client), and not the cached miss
+    row = scan(["IDUB"])
+    assert row["match_found"] is True
+    # the routed PDF stays put: one file in one folder, no _1 copies
+    assert row["pdf_final_path"] == first["pdf_final_path"]
+    assert [p.name for p in (tmp_path / "n").iterdir()] == ["10.1_x.pdf"]
+    assert not (tmp_path / "f").exists()
+    assert not staged.exists()
+
+
+@pytest.mark.asyncio
+async def test_service_ocr_budget_is_per_job(tmp_path: Path):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    c.drawImage(ImageReader(Image.new("RGB", (40, 40), "white")), 10, 10)
+    c.save()
+
+    async def handler(request):
+        if request.url.host == "api.unpaywall.org":
+            url = f"https://pdfs.org/{request.url.path.split('/')[-1]}.pdf"
+            return httpx.Response(
+                200, json={"is_oa": True, "best_oa_location": {"url_for_pdf": url}}
+            )
+        if request.url.host == "pdfs.org":
+            return httpx.Response(200, content=buf.getvalue())
+        return httpx.Response(404)
+
+    cfg = _cfg(tmp_path)
+    cfg.strings = ["IDUB"]
+    cfg.ocr = OcrConfig(
+        enabled=True, engine="test_service:fake_engine", workers=1, max_pages=1
+    )
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as mock:
+        async with pf.HarvestService(cfg, mock, mock) as service:
+            for doi in ("10.1/a", "10.1/b"):  # each job spends the whole page budget
+                job = await service.submit([doi])
+                await asyncio.wait_for(job.done_event.wait(), 30)
+                assert job.rows[0]["match_found"] is True
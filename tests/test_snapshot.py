@@ -0,0 +1,94 @@
+# tests/test_snapshot.py
+import asyncio
+import gzip
+import json
+from pathlib import Path
+
+import httpx
+
+import PDF_Finder as pf
+from PDF_Finder.snapshot import dump_date, iter_snapshot, snapshot_for
+
+
+# ruff formatting
+def _dump(path: Path, lines):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for obj in lines:
+            f.write(json.dumps(obj) + "\n")
+
+
+def test_iter_snapshot_records_and_pages(tmp_path: Path):
+    dump = tmp_path / "crossref.jsonl.gz"
+    _dump(
+        dump,
+        [
+            {"DOI": "10.1/A", "title": ["a"]},
+            {"items": [{"DOI": "10.1/b"}, {"DOI": "10.1/c"}]},
+        ],
+    )
+    assert [r["DOI"] for r in iter_snapshot(dump)] == ["10.1/A", "10.1/b", "10.1/c"]
+
+
+def test_snapshot_index_lookup_and_staleness(tmp_path: Path):
+    idx = pf.SnapshotIndex(tmp_path / "u.sqlite")
+    n = idx.build(
+        [{"doi": "10.1/X", "is_oa": True}, {"no_doi": 1}], updated=1000.0, batch=1
+    )
+    assert n == 1 and len(idx) == 1
+    assert idx.get("doi:10.1/x")["is_oa"] is True
+    assert idx.get("10.1/missing") is None
+    assert idx.get("10.1/x", max_age=10, now=1005.0) is not None
+    assert idx.get("10.1/x", max_age=10, now=2000.0) is None
+
+
+def test_prefetch_uses_snapshot_before_live_api(tmp_path: Path):
+    from PDF_Finder.orchestrator import prefetch_one
+
+    dump = tmp_path / "unpaywall.jsonl.gz"
+    _dump(
+        dump,
+        [{"doi": "10.1/x", "is_oa": True, "best_oa_location": {"url": "https://h/x.pdf"}}],
+    )
+    cfg = pf.Config.from_dict({
+        "email": "test@example.com",
+        "cache": {"enabled": False},
+        "snapshots": {"unpaywall": str(dump), "max_age_days": 0},
+    })
+    assert pf.build_indexes(tmp_path, cfg) == {"unpaywall": 1}
+    assert snapshot_for(tmp_path, cfg, "crossref") == (None, None)
+
+    hosts = []
+
+    async def handler(request):
+        hosts.append(request.url.host)
+        return httpx.Response(200, json={"message": {}})
+
+    async def go():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await prefetch_one("10.1/x", cfg, client, tmp_path)
+
+    row = asyncio.run(go())
+    assert row["pdf_url"] == "https://h/x.pdf"
+    assert hosts == ["api.crossref.org"]  # Unpaywall answered locally
+
+
+def test_snapshot_date_ignores_file_mtime(tmp_path: Path):
+    old = tmp_path / "unpaywall.jsonl.gz"  # freshly written, but the records are old
+    _dump(old, [{"doi": "10.1/old", "updated": "2001-02-03T04:05:06"}])
+    named = tmp_path / "crossref_2002-01-01.jsonl.gz"
+    _dump(named, [{"DOI": "10.1/named"}])
+    cfg = pf.Config.from_dict({
+        "snapshots": {"unpaywall": str(old), "crossref": str(named), "max_age_days": 30},
+    })
+    pf.build_indexes(tmp_path, cfg)
+
+    idx, max_age = snapshot_for(tmp_path, cfg, "unpaywall")
+    assert idx.get("10.1/old") is not None
+    assert idx.get("10.1/old", max_age) is None  # stale: goes to the live API
+    idx, max_age = snapshot_for(tmp_path, cfg, "crossref")
+    assert idx.get("10.1/named", max_age) is None
+    assert idx.get("10.1/named", max_age, now=1009843200.0 + 86400) is not None
+
+    cfg.snapshots.unpaywall_date = "2001-02-01"
+    assert dump_date(cfg, "unpaywall", old) == 980985600.0